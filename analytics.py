@@ -0,0 +1,159 @@
+import asyncio
+import math
+import time
+
+from bisect import bisect_left
+from collections import deque
+
+import discord
+
+from storage import ViewStore
+from tickets import Ticket
+
+# Корзины растут в 2^(1/4) раза, от секунды до ~50 дней: перцентиль точен до 19%, а память не зависит от числа тикетов
+BOUNDS = [2 ** (step / 4) for step in range(90)]
+
+
+class RollingHistogram:
+    def __init__(self, window: float, slots: int):
+        self.window = window
+        self.slot_length = window / slots
+        self.slots: deque[tuple[int, dict[int, int]]] = deque()
+        self.totals = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+
+    def rotate(self, now: float):
+        # Окно сдвигается целыми слотами, устаревший слот вычитается из итогов целиком
+        oldest = int((now - self.window) // self.slot_length)
+        while self.slots and self.slots[0][0] <= oldest:
+            slot, counts = self.slots.popleft()
+            for bucket, count in counts.items():
+                self.totals[bucket] -= count
+                self.count -= count
+
+    def observe(self, value: float, now: float):
+        self.rotate(now)
+        slot = int(now // self.slot_length)
+        if not self.slots or self.slots[-1][0] < slot:
+            self.slots.append((slot, {}))
+        counts = self.slots[-1][1]
+        bucket = bisect_left(BOUNDS, value)
+        counts[bucket] = counts.get(bucket, 0) + 1
+        self.totals[bucket] += 1
+        self.count += 1
+
+    def percentile(self, q: float, now: float) -> float | None:
+        self.rotate(now)
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for bucket, count in enumerate(self.totals):
+            seen += count
+            if seen >= rank:
+                return BOUNDS[min(bucket, len(BOUNDS) - 1)]
+
+    def to_record(self) -> list:
+        return [[slot, {str(bucket): count for bucket, count in counts.items()}] for slot, counts in self.slots]
+
+    def load(self, record: list):
+        for slot, counts in record:
+            counts = {int(bucket): count for bucket, count in counts.items()}
+            self.slots.append((slot, counts))
+            for bucket, count in counts.items():
+                self.totals[bucket] += count
+                self.count += count
+
+
+class TicketStats:
+    def __init__(self, window: float, slots: int):
+        self.first_reply = RollingHistogram(window, slots)
+        self.lifetime = RollingHistogram(window, slots)
+        # Сколько пользователь ждал, прежде чем вызвать руководство
+        self.pings = RollingHistogram(window, slots)
+        self.answered: set[int] = set()
+
+    def to_record(self) -> dict:
+        return {
+            'first_reply': self.first_reply.to_record(),
+            'lifetime': self.lifetime.to_record(),
+            'pings': self.pings.to_record(),
+            'answered': list(self.answered),
+        }
+
+    def load(self, record: dict):
+        self.first_reply.load(record['first_reply'])
+        self.lifetime.load(record['lifetime'])
+        self.pings.load(record['pings'])
+        self.answered.update(record['answered'])
+
+
+def opened_at(ticket: Ticket) -> float:
+    # Канал мог долго лежать в пуле, поэтому время открытия берем из id первого сообщения тикета
+    return discord.utils.snowflake_time(ticket.message_id or ticket.channel_id).timestamp()
+
+
+class TicketAnalytics:
+    def __init__(self, store: ViewStore, kind: str, window: float, slots: int):
+        self.store = store
+        self.kind = kind
+        self.window = window
+        self.slots = slots
+        self.guilds: dict[int, TicketStats] = {}
+        self.dirty: set[int] = set()
+
+    def load(self):
+        for record in self.store.all(self.kind):
+            self.get(record['message_id']).load(record)
+
+    def get(self, guild_id: int) -> TicketStats:
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = TicketStats(self.window, self.slots)
+        return self.guilds[guild_id]
+
+    def message(self, ticket: Ticket, created_at: float):
+        stats = self.get(ticket.guild_id)
+        if ticket.channel_id in stats.answered:
+            return
+        stats.answered.add(ticket.channel_id)
+        stats.first_reply.observe(created_at - opened_at(ticket), created_at)
+        self.dirty.add(ticket.guild_id)
+
+    def ping(self, ticket: Ticket):
+        now = time.time()
+        self.get(ticket.guild_id).pings.observe(now - opened_at(ticket), now)
+        self.dirty.add(ticket.guild_id)
+
+    def closed(self, ticket: Ticket):
+        now = time.time()
+        self.get(ticket.guild_id).lifetime.observe(now - opened_at(ticket), now)
+        self.dirty.add(ticket.guild_id)
+
+    def forget(self, ticket: Ticket):
+        stats = self.guilds.get(ticket.guild_id)
+        if stats and ticket.channel_id in stats.answered:
+            stats.answered.discard(ticket.channel_id)
+            self.dirty.add(ticket.guild_id)
+
+    def persist(self):
+        for guild_id in self.dirty:
+            self.store.put(self.kind, {'message_id': guild_id, **self.guilds[guild_id].to_record()})
+        self.dirty.clear()
+
+    async def persist_periodically(self, interval: float):
+        # Последнее окно сохраняет shutdown() до сброса хранилища
+        while True:
+            await asyncio.sleep(interval)
+            self.persist()
+
+
+def format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return '—'
+    if seconds < 60:
+        return f'{int(seconds)} сек.'
+    if seconds < 60*60:
+        return f'{int(seconds // 60)} мин.'
+    if seconds < 60*60*24:
+        return f'{int(seconds // 3600)} ч. {int(seconds % 3600 // 60)} мин.'
+    return f'{int(seconds // 86400)} д. {int(seconds % 86400 // 3600)} ч.'
@@ -0,0 +1,78 @@
+import argparse
+import json
+import subprocess
+import sys
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ('startup_restore', 'ticket_clicks', 'ticket_close', 'join_wave', 'regulations_republish', 'large_guild_full', 'large_guild_lean')
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m bench', description='Нагрузочные сценарии против локального заменителя Discord API')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario', help=f'сценарии из {", ".join(SCENARIOS)}, по умолчанию все')
+    parser.add_argument('--scale', type=float, default=0.1, help='множитель окон лимитов Discord, 1 - реальные лимиты')
+    parser.add_argument('--views', type=int, default=10000, help='сохраненных view для startup_restore')
+    parser.add_argument('--clicks', type=int, default=200, help='одновременных нажатий для ticket_clicks')
+    parser.add_argument('--closes', type=int, default=20, help='закрываемых тикетов для ticket_close')
+    parser.add_argument('--history', type=int, default=1000, help='сообщений в каждом тикете для ticket_close')
+    parser.add_argument('--members', type=int, default=1000, help='новых участников для join_wave')
+    parser.add_argument('--guild-members', type=int, default=50000, help='участников сервера для large_guild_*')
+    parser.add_argument('--rules', type=int, default=60, help='правил в уставе для regulations_republish')
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--json', action='store_true', help='вывести результаты в JSON')
+    parser.add_argument('--verbose', action='store_true', help='показывать логи бота')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f'неизвестный сценарий: {name}')
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    return args
+
+
+def run_child(name: str, argv: list[str], verbose: bool) -> dict:
+    # Каждый сценарий запускается в отдельном процессе: клиент, хранилище и настройки bot.py живут на уровне модуля
+    command = [sys.executable, '-m', 'bench', '--child', name, *argv]
+    process = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    lines = process.stdout.splitlines()
+    for line in lines:
+        if line.startswith('BENCH_RESULT '):
+            if verbose:
+                print(process.stdout)
+            return json.loads(line.removeprefix('BENCH_RESULT '))
+    print('\n'.join(lines[-40:]), file=sys.stderr)
+    raise SystemExit(f'Сценарий {name} завершился с ошибкой ({process.returncode})')
+
+
+def print_table(reports: list[dict]):
+    print(f'{"scenario":<24}{"wall, s":>10}{"rest":>8}{"429":>6}{"p50, ms":>10}{"p99, ms":>10}')
+    for report in reports:
+        print(
+            f'{report["scenario"]:<24}{report["wall"]:>10.2f}{report["rest_calls"]:>8}{report["ratelimited"]:>6}'
+            f'{report["p50"] * 1000:>10.1f}{report["p99"] * 1000:>10.1f}'
+        )
+        extra = {key: value for key, value in report.items() if key not in ('scenario', 'wall', 'rest_calls', 'ratelimited', 'p50', 'p99')}
+        print('    ' + ', '.join(f'{key}={value:.3f}' if isinstance(value, float) else f'{key}={value}' for key, value in extra.items()))
+
+
+def main(argv: list[str]):
+    args = parse_args(argv)
+    if args.child:
+        from bench.scenarios import run
+        run(args.child, args)
+        return
+
+    options = []
+    for name in ('scale', 'views', 'clicks', 'closes', 'history', 'members', 'guild_members', 'rules', 'timeout'):
+        options += [f'--{name.replace("_", "-")}', str(getattr(args, name))]
+    reports = [run_child(name, options, args.verbose) for name in args.scenarios]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_table(reports)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
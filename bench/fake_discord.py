@@ -0,0 +1,466 @@
+import asyncio
+import itertools
+import json
+import re
+import time
+
+from datetime import datetime, timezone
+
+from aiohttp import web, WSMsgType
+
+# Лимиты маршрутов, близкие к настоящим: (метод, путь, запросов, окно в секундах)
+ROUTE_LIMITS = (
+    ('POST', re.compile(r'/channels/\d+/messages'), 5, 5),
+    ('PATCH', re.compile(r'/channels/\d+'), 2, 600),
+    ('POST', re.compile(r'/guilds/\d+/channels'), 5, 5),
+    ('PATCH', re.compile(r'/guilds/\d+/members/\d+'), 10, 10),
+    ('DELETE', re.compile(r'/channels/\d+/messages/\d+'), 5, 1),
+)
+DEFAULT_LIMIT = (50, 1)
+LARGE_THRESHOLD = 250
+CHUNK_SIZE = 1000
+GLOBAL_LIMIT = (50, 1)
+MAJOR_RESOURCES = ('channels', 'guilds', 'webhooks')
+
+
+def json_response(data, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py разбирает тело как JSON, только если Content-Type ровно application/json
+    return web.Response(body=json.dumps(data).encode(), status=status, headers={**(headers or {}), 'Content-Type': 'application/json'})
+
+
+def timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def route_template(method: str, path: str) -> str:
+    # Первый id после channels/guilds/webhooks остается в ключе, как major parameter в Discord
+    segments = path.strip('/').split('/')
+    template = []
+    for position, segment in enumerate(segments):
+        if segment.isdigit() and not (position == 1 and segments[0] in MAJOR_RESOURCES):
+            segment = '{id}'
+        template.append(segment)
+    return f'{method} /' + '/'.join(template)
+
+
+class RateLimitBucket:
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def take(self) -> float:
+        now = time.time()
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        if self.remaining <= 0:
+            return self.reset_at - now
+        self.remaining -= 1
+        return 0.0
+
+
+class FakeDiscord:
+    def __init__(self, guild: dict, scale: float = 1.0):
+        self.scale = scale
+        self.ids = itertools.count(5 * 10 ** 18)
+        self.user = self.make_user(next(self.ids), 'amaterasu-bench', bot=True)
+        self.application_id = self.user['id']
+        self.guild = guild
+        self.channels = {channel['id']: channel for channel in guild['channels']}
+        self.members = {member['user']['id']: member for member in guild['members']}
+        self.messages: dict[str, dict] = {}
+        self.buckets: dict[str, RateLimitBucket] = {}
+        self.global_bucket = RateLimitBucket(GLOBAL_LIMIT[0], GLOBAL_LIMIT[1] * scale)
+        self.calls: dict[str, int] = {}
+        self.ratelimited = 0
+        self.interactions: dict[str, dict] = {}
+        self.member_updates: dict[str, float] = {}
+        self.changed = asyncio.Event()
+        self.ws: web.WebSocketResponse | None = None
+        self.sequence = 0
+        self.identified = asyncio.Event()
+        self.runner: web.AppRunner | None = None
+        self.url = ''
+        self.routes = [
+            ('GET', re.compile(r'/users/@me'), self.get_me),
+            ('GET', re.compile(r'/oauth2/applications/@me'), self.get_application),
+            ('GET', re.compile(r'/gateway(/bot)?'), self.get_gateway),
+            ('PUT', re.compile(r'/applications/\d+/guilds/\d+/commands'), self.put_commands),
+            ('GET', re.compile(r'/applications/\d+/guilds/\d+/commands'), self.put_commands),
+            ('POST', re.compile(r'/channels/(?P<channel_id>\d+)/messages'), self.create_message),
+            ('GET', re.compile(r'/channels/(?P<channel_id>\d+)/messages'), self.get_history),
+            ('POST', re.compile(r'/channels/(?P<channel_id>\d+)/messages/bulk-delete'), self.bulk_delete),
+            ('GET', re.compile(r'/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)'), self.get_message),
+            ('PATCH', re.compile(r'/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)'), self.edit_message),
+            ('DELETE', re.compile(r'/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)'), self.delete_message),
+            ('PUT', re.compile(r'/channels/\d+/pins/\d+'), self.no_content),
+            ('PATCH', re.compile(r'/channels/(?P<channel_id>\d+)'), self.edit_channel),
+            ('DELETE', re.compile(r'/channels/(?P<channel_id>\d+)'), self.delete_channel),
+            ('POST', re.compile(r'/guilds/\d+/channels'), self.create_channel),
+            ('GET', re.compile(r'/guilds/\d+/members/(?P<user_id>\d+)'), self.get_member),
+            ('PATCH', re.compile(r'/guilds/\d+/members/(?P<user_id>\d+)'), self.edit_member),
+            ('PUT', re.compile(r'/guilds/\d+/members/(?P<user_id>\d+)/roles/\d+'), self.add_role),
+            ('POST', re.compile(r'/interactions/(?P<interaction_id>\d+)/(?P<token>[^/]+)/callback'), self.interaction_callback),
+            ('PATCH', re.compile(r'/webhooks/\d+/(?P<token>[^/]+)/messages/@original'), self.edit_original),
+            ('DELETE', re.compile(r'/webhooks/\d+/(?P<token>[^/]+)/messages/@original'), self.no_content),
+            ('POST', re.compile(r'/webhooks/\d+/(?P<token>[^/]+)'), self.followup),
+        ]
+
+    # Сервер
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        app = web.Application(client_max_size=64 * 1024 ** 2)
+        app.router.add_get('/gateway', self.gateway)
+        app.router.add_route('*', '/api/v10/{path:.*}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://{host}:{port}'
+
+    async def close(self):
+        if self.ws:
+            await self.ws.close()
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def until(self, predicate, timeout: float):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            self.changed.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError('Сценарий не завершился вовремя')
+            try:
+                # Условие может зависеть и от состояния бота, поэтому проверяем его не реже раза в 50 мс
+                await asyncio.wait_for(self.changed.wait(), min(remaining, 0.05))
+            except asyncio.TimeoutError:
+                pass
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def ratelimit(self, method: str, path: str) -> tuple[float, dict]:
+        limit, window = DEFAULT_LIMIT
+        for route_method, pattern, route_limit, route_window in ROUTE_LIMITS:
+            if method == route_method and pattern.fullmatch(path):
+                limit, window = route_limit, route_window
+                break
+        key = route_template(method, path)
+        bucket = self.buckets.setdefault(key, RateLimitBucket(limit, window * self.scale))
+        retry_after = bucket.take()
+        if not retry_after and not path.startswith(('/interactions', '/webhooks')):
+            retry_after = self.global_bucket.take()
+        headers = {
+            'X-RateLimit-Limit': str(bucket.limit),
+            'X-RateLimit-Remaining': str(max(bucket.remaining, 0)),
+            'X-RateLimit-Reset': f'{bucket.reset_at:.3f}',
+            'X-RateLimit-Reset-After': f'{max(bucket.reset_at - time.time(), 0):.3f}',
+            'X-RateLimit-Bucket': str(abs(hash(key))),
+        }
+        return retry_after, headers
+
+    async def handle(self, request: web.Request) -> web.Response:
+        path = '/' + request.match_info['path']
+        method = request.method
+        retry_after, headers = self.ratelimit(method, path)
+        if retry_after:
+            self.ratelimited += 1
+            headers['Via'] = '1.1 google'
+            headers['X-RateLimit-Scope'] = 'user'
+            body = {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': False}
+            return json_response(body, status=429, headers=headers)
+
+        template = route_template(method, path)
+        self.calls[template] = self.calls.get(template, 0) + 1
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if route_method == method and match:
+                if method == 'GET':
+                    body = dict(request.query)
+                else:
+                    body = await request.json() if request.can_read_body and request.content_type == 'application/json' else None
+                status, data = await handler(body, **match.groupdict())
+                self.changed.set()
+                if status == 204:
+                    return web.Response(status=204, headers=headers)
+                return json_response(data, status=status, headers=headers)
+        return json_response({'message': f'Unknown route {template}', 'code': 0}, status=404, headers=headers)
+
+    # Объекты
+
+    def make_user(self, user_id: int, name: str, bot: bool = False) -> dict:
+        return {'id': str(user_id), 'username': name, 'discriminator': '0', 'global_name': None, 'avatar': None, 'bot': bot}
+
+    def make_member(self, user_id: int, roles: list = ()) -> dict:
+        return {
+            'user': self.make_user(user_id, f'user{user_id}'),
+            'roles': [str(role) for role in roles],
+            'joined_at': timestamp(),
+            'deaf': False,
+            'mute': False,
+            'flags': 0,
+        }
+
+    def make_message(self, channel_id: str, body: dict, author: dict = None) -> dict:
+        return {
+            'id': str(next(self.ids)),
+            'channel_id': channel_id,
+            'guild_id': self.guild['id'],
+            'author': author or self.user,
+            'content': body.get('content') or '',
+            'embeds': body.get('embeds') or [],
+            'components': body.get('components') or [],
+            'attachments': [],
+            'mentions': [],
+            'mention_roles': [],
+            'mention_everyone': False,
+            'pinned': False,
+            'tts': False,
+            'type': 0,
+            'flags': 0,
+            'timestamp': timestamp(),
+            'edited_timestamp': None,
+        }
+
+    def add_message(self, channel_id: int, body: dict = None) -> dict:
+        message = self.make_message(str(channel_id), body or {})
+        self.messages[message['id']] = message
+        return message
+
+    def add_channel(self, name: str, channel_type: int = 0, parent_id: int = None, channel_id: int = None) -> dict:
+        channel = {
+            'id': str(channel_id or next(self.ids)),
+            'type': channel_type,
+            'guild_id': self.guild['id'],
+            'name': name,
+            'position': len(self.channels),
+            'permission_overwrites': [],
+            'parent_id': str(parent_id) if parent_id else None,
+            'nsfw': False,
+            'topic': None,
+        }
+        if channel_type == 2:
+            channel.update(bitrate=64000, user_limit=0)
+        self.channels[channel['id']] = channel
+        self.guild['channels'].append(channel)
+        return channel
+
+    # Шлюз
+
+    async def gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0, compress=False)
+        await ws.prepare(request)
+        self.ws = ws
+        await self.send(10, {'heartbeat_interval': 41250})
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            payload = json.loads(message.data)
+            if payload['op'] == 1:
+                await self.send(11, None)
+            elif payload['op'] == 2:
+                await self.identify(payload['d'])
+            elif payload['op'] == 8:
+                await self.request_members(payload['d'])
+        return ws
+
+    async def send(self, op: int, data, event: str = None):
+        payload = {'op': op, 'd': data, 's': None, 't': event}
+        if op == 0:
+            self.sequence += 1
+            payload['s'] = self.sequence
+        await self.ws.send_str(json.dumps(payload))
+
+    async def dispatch(self, event: str, data: dict):
+        await self.send(0, data, event)
+
+    async def identify(self, data: dict):
+        shard_id, shard_count = data.get('shard') or (0, 1)
+        guilds = [self.guild] if (int(self.guild['id']) >> 22) % shard_count == shard_id else []
+        await self.dispatch('READY', {
+            'v': 10,
+            'user': self.user,
+            'guilds': [{'id': guild['id'], 'unavailable': True} for guild in guilds],
+            'session_id': 'bench',
+            'resume_gateway_url': self.url.replace('http', 'ws') + '/gateway',
+            'application': {'id': self.application_id, 'flags': 0},
+            'shard': [shard_id, shard_count],
+        })
+        for guild in guilds:
+            # Как и Discord, большие серверы приходят без списка участников, его нужно запросить отдельно
+            large = len(self.members) > LARGE_THRESHOLD
+            members = [self.make_member(int(self.user['id']))] if large else list(self.members.values())
+            await self.dispatch('GUILD_CREATE', {**guild, 'large': large, 'member_count': len(self.members), 'members': members})
+        self.identified.set()
+
+    async def request_members(self, data: dict):
+        members = list(self.members.values())
+        chunks = [members[start:start + CHUNK_SIZE] for start in range(0, len(members), CHUNK_SIZE)] or [[]]
+        for index, chunk in enumerate(chunks):
+            await self.dispatch('GUILD_MEMBERS_CHUNK', {
+                'guild_id': data['guild_id'],
+                'members': chunk,
+                'chunk_index': index,
+                'chunk_count': len(chunks),
+                'nonce': data.get('nonce'),
+            })
+
+    async def member_join(self, user_id: int) -> dict:
+        member = self.make_member(user_id)
+        self.members[member['user']['id']] = member
+        await self.dispatch('GUILD_MEMBER_ADD', {**member, 'guild_id': self.guild['id']})
+        return member
+
+    async def click(self, message: dict, custom_id: str, user_id: int) -> str:
+        interaction_id = str(next(self.ids))
+        token = f'token-{interaction_id}'
+        member = self.members.get(str(user_id)) or self.make_member(user_id)
+        self.interactions[token] = {'dispatched': time.perf_counter()}
+        await self.dispatch('INTERACTION_CREATE', {
+            'id': interaction_id,
+            'application_id': self.application_id,
+            'type': 3,
+            'token': token,
+            'version': 1,
+            'guild_id': self.guild['id'],
+            'channel_id': message['channel_id'],
+            'channel': self.channels.get(message['channel_id']),
+            'member': {**member, 'permissions': '0'},
+            'message': message,
+            'data': {'custom_id': custom_id, 'component_type': 2},
+            'locale': 'ru',
+            'guild_locale': 'ru',
+            'app_permissions': '0',
+            'entitlements': [],
+        })
+        return token
+
+    # REST
+
+    async def no_content(self, body, **kwargs):
+        return 204, None
+
+    async def get_me(self, body):
+        return 200, self.user
+
+    async def get_application(self, body):
+        return 200, {
+            'id': self.application_id,
+            'name': self.user['username'],
+            'description': '',
+            'icon': None,
+            'bot_public': False,
+            'bot_require_code_grant': False,
+            'owner': self.user,
+            'verify_key': '',
+            'flags': 0,
+        }
+
+    async def get_gateway(self, body):
+        return 200, {
+            'url': self.url.replace('http', 'ws') + '/gateway',
+            'shards': 1,
+            'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 1},
+        }
+
+    async def put_commands(self, body):
+        return 200, []
+
+    async def create_message(self, body, channel_id):
+        message = self.make_message(channel_id, body or {})
+        self.messages[message['id']] = message
+        return 200, message
+
+    async def get_history(self, body, channel_id):
+        # Как и Discord, отдаем страницу от новых к старым, after/before - границы по id
+        limit = int(body.get('limit', 50))
+        ids = sorted(int(message_id) for message_id, message in self.messages.items() if message['channel_id'] == channel_id)
+        if 'after' in body:
+            page = [message_id for message_id in ids if message_id > int(body['after'])][:limit]
+        else:
+            if 'before' in body:
+                ids = [message_id for message_id in ids if message_id < int(body['before'])]
+            page = ids[-limit:]
+        return 200, [self.messages[str(message_id)] for message_id in reversed(page)]
+
+    async def bulk_delete(self, body, channel_id):
+        for message_id in body.get('messages', []):
+            self.messages.pop(message_id, None)
+        return 204, None
+
+    async def get_message(self, body, channel_id, message_id):
+        message = self.messages.get(message_id)
+        if message is None:
+            return 404, {'message': 'Unknown Message', 'code': 10008}
+        return 200, message
+
+    async def edit_message(self, body, channel_id, message_id):
+        message = self.messages.get(message_id)
+        if message is None:
+            return 404, {'message': 'Unknown Message', 'code': 10008}
+        message.update({key: value for key, value in body.items() if key in ('content', 'embeds', 'components')})
+        message['edited_timestamp'] = timestamp()
+        return 200, message
+
+    async def delete_message(self, body, channel_id, message_id):
+        if self.messages.pop(message_id, None) is None:
+            return 404, {'message': 'Unknown Message', 'code': 10008}
+        return 204, None
+
+    async def edit_channel(self, body, channel_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            return 404, {'message': 'Unknown Channel', 'code': 10003}
+        channel.update({key: value for key, value in body.items() if key in ('name', 'permission_overwrites', 'parent_id', 'topic')})
+        await self.dispatch('CHANNEL_UPDATE', channel)
+        return 200, channel
+
+    async def delete_channel(self, body, channel_id):
+        channel = self.channels.pop(channel_id, None)
+        if channel is None:
+            return 404, {'message': 'Unknown Channel', 'code': 10003}
+        self.guild['channels'].remove(channel)
+        await self.dispatch('CHANNEL_DELETE', channel)
+        return 200, channel
+
+    async def create_channel(self, body):
+        channel = self.add_channel(body['name'], body.get('type', 0), body.get('parent_id'))
+        channel['permission_overwrites'] = body.get('permission_overwrites', [])
+        await self.dispatch('CHANNEL_CREATE', channel)
+        return 200, channel
+
+    async def get_member(self, body, user_id):
+        member = self.members.get(user_id)
+        if member is None:
+            return 404, {'message': 'Unknown Member', 'code': 10007}
+        return 200, member
+
+    async def edit_member(self, body, user_id):
+        member = self.members.get(user_id)
+        if member is None:
+            return 404, {'message': 'Unknown Member', 'code': 10007}
+        if 'roles' in body:
+            member['roles'] = body['roles']
+        self.member_updates.setdefault(user_id, time.perf_counter())
+        return 200, member
+
+    async def add_role(self, body, user_id):
+        self.member_updates.setdefault(user_id, time.perf_counter())
+        return 204, None
+
+    async def interaction_callback(self, body, interaction_id, token):
+        self.interactions[token].setdefault('responded', time.perf_counter())
+        return 204, None
+
+    async def edit_original(self, body, token):
+        self.interactions[token].setdefault('completed', time.perf_counter())
+        return 200, self.make_message(str(self.guild['id']), body or {})
+
+    async def followup(self, body, token):
+        self.interactions[token].setdefault('completed', time.perf_counter())
+        return 200, self.make_message(str(self.guild['id']), body or {})
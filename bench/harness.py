@@ -0,0 +1,143 @@
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+import discord
+import yarl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import settings
+
+from bench.fake_discord import FakeDiscord
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[q - 1]
+
+
+def rss() -> int:
+    # Текущий, а не пиковый размер резидентной памяти процесса
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def make_roles() -> list[dict]:
+    role_ids = {int(settings.GUILD), *settings.ADMIN_ROLES, *settings.TICKETS_RESPONDER_ROLES, *settings.JOIN_ROLES, *settings.CLAN_MEMBER_ROLES}
+    return [
+        {
+            'id': str(role_id),
+            'name': '@everyone' if role_id == settings.GUILD else f'role{position}',
+            'color': 0,
+            'hoist': False,
+            'position': position,
+            'permissions': '0',
+            'managed': False,
+            'mentionable': False,
+            'flags': 0,
+        }
+        for position, role_id in enumerate(sorted(role_ids))
+    ]
+
+
+def make_fake(scale: float, members: int = 10) -> FakeDiscord:
+    guild = {
+        'id': str(settings.GUILD),
+        'name': 'bench',
+        'icon': None,
+        'owner_id': '1',
+        'roles': [],
+        'emojis': [],
+        'stickers': [],
+        'features': [],
+        'channels': [],
+        'threads': [],
+        'members': [],
+        'presences': [],
+        'voice_states': [],
+        'stage_instances': [],
+        'guild_scheduled_events': [],
+        'large': False,
+        'unavailable': False,
+        'verification_level': 0,
+        'default_message_notifications': 0,
+        'explicit_content_filter': 0,
+        'mfa_level': 0,
+        'premium_tier': 0,
+        'preferred_locale': 'ru',
+        'system_channel_flags': 0,
+        'nsfw_level': 0,
+        'afk_timeout': 300,
+    }
+    fake = FakeDiscord(guild, scale)
+    guild['roles'] = make_roles()
+    fake.add_channel('tickets', 4, channel_id=settings.TICKETS_CATEGORY)
+    for name in ('MEMBERS_COUNTER_CHANNEL', 'CLAN_MEBMERS_COUNTER_CHANNEL'):
+        fake.add_channel(name.lower(), 2, channel_id=getattr(settings, name))
+    for name in ('TICKET_FORMS_CHANNEL', 'NOTIFICATIONS_CHANNEL', 'ORDERS_CHANNEL', 'NEWS_CHANNEL', 'SYMBOLICS_CHANNEL', 'REGULATIONS_CHANNEL', 'ARMY_REGULATIONS_CHANNEL'):
+        fake.add_channel(name.lower(), channel_id=getattr(settings, name))
+    for user_id in range(1, members + 1):
+        member = fake.make_member(user_id)
+        fake.members[member['user']['id']] = member
+    return fake
+
+
+def configure(workdir: Path, **overrides):
+    # bot.py читает настройки через import *, поэтому подменяем их до импорта
+    settings.STORE_PATH = str(workdir / 'amaterasu.sqlite3')
+    settings.LEGACY_DB_DIR = str(workdir)
+    settings.VIEW_AUDIT_DELAY = 0
+    settings.SWEEP_INTERVAL = 60 * 60
+    settings.METRICS_PORT = None
+    settings.TRANSCRIPTS_DIR = str(workdir / 'transcripts')
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+
+
+async def start_bot(fake: FakeDiscord, timeout: float = 120):
+    discord.http.Route.BASE = f'{fake.url}/api/v10'
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(fake.url.replace('http', 'ws') + '/gateway')
+    import bot
+
+    bot.setup()
+
+    calls = []
+    request = bot.client.http.request
+
+    async def timed_request(route, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        finally:
+            calls.append(time.perf_counter() - started)
+
+    bot.client.http.request = timed_request
+    started = time.perf_counter()
+    task = asyncio.create_task(bot.client.start('bench'))
+    deadline = started + timeout
+    while not bot.client.is_ready():
+        if task.done():
+            task.result()
+        if time.perf_counter() > deadline:
+            raise TimeoutError('Бот не подключился к тестовому серверу')
+        await asyncio.sleep(0.01)
+    return bot, task, calls, time.perf_counter() - started
+
+
+async def stop_bot(bot, task: asyncio.Task):
+    await bot.client.close()
+    await asyncio.gather(task, return_exceptions=True)
+    await bot.shutdown()
+
+
+def workdir() -> Path:
+    return Path(tempfile.mkdtemp(prefix='amaterasu-bench-'))
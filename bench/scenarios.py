@@ -0,0 +1,260 @@
+import asyncio
+import gc
+import json
+import sys
+import time
+
+from bench.harness import configure, make_fake, percentile, rss, start_bot, stop_bot, workdir
+
+import settings
+
+from storage import open_store
+
+
+def result(name: str, fake, wall: float, samples: list[float], calls_before: int = 0, ratelimited_before: int = 0, **extra) -> dict:
+    return {
+        'scenario': name,
+        'wall': wall,
+        'rest_calls': fake.total_calls - calls_before,
+        'ratelimited': fake.ratelimited - ratelimited_before,
+        'p50': percentile(samples, 50),
+        'p99': percentile(samples, 99),
+        **extra,
+    }
+
+
+async def startup_restore(args) -> dict:
+    directory = workdir()
+    configure(directory)
+    fake = make_fake(args.scale)
+    await fake.start()
+
+    store = open_store(settings.STORE_BACKEND, settings.STORE_PATH)
+    notifications, tickets = [], []
+    for number in range(args.views // 2):
+        channel = fake.add_channel(f'ticket-{number}', parent_id=settings.TICKETS_CATEGORY)
+        notification = fake.add_message(settings.NOTIFICATIONS_CHANNEL)
+        message = fake.add_message(channel['id'])
+        notifications.append({
+            'message_id': int(notification['id']),
+            'channel_id': settings.NOTIFICATIONS_CHANNEL,
+            'ticket_channel_id': int(channel['id']),
+            'user_id': number + 1,
+            'channel_prefix': 'bench',
+            'persistent': True,
+        })
+        tickets.append({
+            'message_id': int(message['id']),
+            'channel_id': int(channel['id']),
+            'notification_id': int(notification['id']),
+            'persistent': True,
+        })
+    store.put_many(settings.NOTIFICATIONS_FILENAME, notifications)
+    store.put_many(settings.TICKETS_FILENAME, tickets)
+    store.close()
+
+    started = time.perf_counter()
+    bot, task, calls, connected = await start_bot(fake)
+    await fake.until(lambda: bot.view_sweep_duration.values, args.timeout)
+    wall = time.perf_counter() - started
+    await stop_bot(bot, task)
+    await fake.close()
+    return result('startup_restore', fake, wall, calls, views=args.views, connect=connected, sweep=bot.view_sweep_duration.values[()])
+
+
+async def ticket_clicks(args) -> dict:
+    directory = workdir()
+    configure(directory)
+    fake = make_fake(args.scale, members=args.clicks)
+    await fake.start()
+
+    form = fake.add_message(settings.TICKET_FORMS_CHANNEL)
+    store = open_store(settings.STORE_BACKEND, settings.STORE_PATH)
+    store.put(settings.TICKET_FORMS_FILENAME, {
+        'message_id': int(form['id']),
+        'channel_id': settings.TICKET_FORMS_CHANNEL,
+        'label': 'bench',
+        'style': 'primary',
+        'channel_prefix': 'bench',
+        'persistent': True,
+    })
+    store.close()
+
+    bot, task, calls, connected = await start_bot(fake)
+    calls_before, ratelimited_before, samples_before = fake.total_calls, fake.ratelimited, len(calls)
+    started = time.perf_counter()
+    tokens = [await fake.click(form, 'amaterasu:form:create', user_id) for user_id in range(1, args.clicks + 1)]
+    interactions = [fake.interactions[token] for token in tokens]
+    await fake.until(lambda: all('completed' in interaction for interaction in interactions), args.timeout)
+    wall = time.perf_counter() - started
+    await stop_bot(bot, task)
+    await fake.close()
+
+    latency = [interaction['completed'] - interaction['dispatched'] for interaction in interactions]
+    responded = [interaction['responded'] - interaction['dispatched'] for interaction in interactions]
+    return result(
+        'ticket_clicks', fake, wall, latency, calls_before, ratelimited_before,
+        clicks=args.clicks,
+        response_p99=percentile(responded, 99),
+        rest_p99=percentile(calls[samples_before:], 99),
+    )
+
+
+async def ticket_close(args) -> dict:
+    directory = workdir()
+    configure(directory)
+    fake = make_fake(args.scale)
+    await fake.start()
+
+    store = open_store(settings.STORE_BACKEND, settings.STORE_PATH)
+    notifications = []
+    for number in range(args.closes):
+        channel = fake.add_channel(f'ticket-{number}', parent_id=settings.TICKETS_CATEGORY)
+        # Кнопка подтверждения должна быть в сообщении, иначе discord.py не найдет DynamicItem
+        button = {'type': 2, 'style': 3, 'label': 'Подтвердить', 'custom_id': f'amaterasu:notification:confirm:{channel["id"]}'}
+        notification = fake.add_message(settings.NOTIFICATIONS_CHANNEL, {'components': [{'type': 1, 'components': [button]}]})
+        for line in range(args.history):
+            fake.add_message(channel['id'], {'content': f'Сообщение {line} ' * 10})
+        notifications.append((notification, channel['id']))
+        store.put(settings.NOTIFICATIONS_FILENAME, {
+            'message_id': int(notification['id']),
+            'channel_id': settings.NOTIFICATIONS_CHANNEL,
+            'ticket_channel_id': int(channel['id']),
+            'user_id': number + 1,
+            'channel_prefix': 'bench',
+            'persistent': True,
+        })
+    store.close()
+
+    bot, task, calls, connected = await start_bot(fake)
+    calls_before, ratelimited_before = fake.total_calls, fake.ratelimited
+    gc.collect()
+    rss_before = rss()
+    started = time.perf_counter()
+    for notification, channel_id in notifications:
+        await fake.click(notification, f'amaterasu:notification:confirm:{channel_id}', 1)
+    await fake.until(lambda: all(channel_id not in fake.channels for notification, channel_id in notifications), args.timeout)
+    wall = time.perf_counter() - started
+    rss_after = rss()
+    closed = [time.perf_counter() - started]
+    archived = sum(bot.transcripts.path(record).stat().st_size for record in bot.transcripts.by_ticket.values())
+    lookup_started = time.perf_counter()
+    found = bot.transcripts.find(settings.GUILD, user_id=1)
+    lookup = time.perf_counter() - lookup_started
+    await stop_bot(bot, task)
+    await fake.close()
+    return result(
+        'ticket_close', fake, wall, closed, calls_before, ratelimited_before,
+        closes=args.closes,
+        history=args.history,
+        transcripts=len(bot.transcripts.by_ticket),
+        archive_kb=archived / 1024,
+        rss_mb=(rss_after - rss_before) / 1024 ** 2,
+        lookup_ms=lookup * 1000,
+        found=len(found),
+    )
+
+
+async def join_wave(args) -> dict:
+    directory = workdir()
+    configure(directory)
+    fake = make_fake(args.scale)
+    await fake.start()
+
+    bot, task, calls, connected = await start_bot(fake)
+    calls_before, ratelimited_before = fake.total_calls, fake.ratelimited
+    started = time.perf_counter()
+    joined = {}
+    for user_id in range(10 ** 6, 10 ** 6 + args.members):
+        joined[str(user_id)] = time.perf_counter()
+        await fake.member_join(user_id)
+    await fake.until(lambda: len(fake.member_updates) >= args.members, args.timeout)
+    wall = time.perf_counter() - started
+    await stop_bot(bot, task)
+    await fake.close()
+
+    latency = [fake.member_updates[user_id] - dispatched for user_id, dispatched in joined.items()]
+    return result('join_wave', fake, wall, latency, calls_before, ratelimited_before, members=args.members)
+
+
+async def regulations_republish(args) -> dict:
+    directory = workdir()
+    path = directory / 'regulations.json'
+    rules = {str(number): {'title': f'Правило {number}', 'description': 'Текст правила. ' * 20} for number in range(1, args.rules + 1)}
+    path.write_text(json.dumps(rules, ensure_ascii=False))
+    configure(directory, REGULATIONS_PATH=str(path), ARMY_REGULATIONS_PATH=str(path))
+    fake = make_fake(args.scale)
+    await fake.start()
+
+    bot, task, calls, connected = await start_bot(fake)
+    calls_before, ratelimited_before, samples_before = fake.total_calls, fake.ratelimited, len(calls)
+    publishes = {}
+    started = time.perf_counter()
+    for name in ('first', 'unchanged', 'edited'):
+        if name == 'edited':
+            rules['1']['description'] = 'Измененный текст правила.'
+            path.write_text(json.dumps(rules, ensure_ascii=False))
+        calls_start = fake.total_calls
+        publish_started = time.perf_counter()
+        await bot.regulations_publishers[settings.GUILD].publish()
+        publishes[name] = (time.perf_counter() - publish_started, fake.total_calls - calls_start)
+    wall = time.perf_counter() - started
+    await stop_bot(bot, task)
+    await fake.close()
+
+    extra = {}
+    for name, (seconds, rest_calls) in publishes.items():
+        extra[f'{name}_seconds'] = seconds
+        extra[f'{name}_calls'] = rest_calls
+    return result('regulations_republish', fake, wall, calls[samples_before:], calls_before, ratelimited_before, rules=args.rules, **extra)
+
+
+async def large_guild(args, lean: bool) -> dict:
+    directory = workdir()
+    configure(directory, LEAN_MEMBER_CACHE=lean)
+    fake = make_fake(args.scale, members=args.guild_members)
+    await fake.start()
+
+    gc.collect()
+    rss_before = rss()
+    bot, task, calls, connected = await start_bot(fake, args.timeout)
+    gc.collect()
+    rss_after = rss()
+    guild = bot.client.get_guild(settings.GUILD)
+    cached = len(guild.members)
+    await stop_bot(bot, task)
+    await fake.close()
+    return result(
+        'large_guild_lean' if lean else 'large_guild_full', fake, connected, calls,
+        guild_members=args.guild_members,
+        cached_members=cached,
+        member_count=guild.member_count,
+        rss_mb=(rss_after - rss_before) / 1024 ** 2,
+    )
+
+
+async def large_guild_full(args) -> dict:
+    return await large_guild(args, lean=False)
+
+
+async def large_guild_lean(args) -> dict:
+    return await large_guild(args, lean=True)
+
+
+SCENARIOS = {
+    'startup_restore': startup_restore,
+    'ticket_clicks': ticket_clicks,
+    'ticket_close': ticket_close,
+    'join_wave': join_wave,
+    'regulations_republish': regulations_republish,
+    'large_guild_full': large_guild_full,
+    'large_guild_lean': large_guild_lean,
+}
+
+
+def run(name: str, args):
+    report = asyncio.run(SCENARIOS[name](args))
+    # Родительский процесс ищет результат по префиксу, остальной вывод - логи бота. Строка пишется одним
+    # вызовом: print() отдельно пишет перевод строки, и между ними вклинивается запись потока логирования
+    sys.stdout.write('BENCH_RESULT ' + json.dumps(report) + '\n')
+    sys.stdout.flush()
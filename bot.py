@@ -0,0 +1,1236 @@
+import asyncio
+import discord
+import hashlib
+import json
+import os
+import re
+import signal
+import time
+import logging
+
+from discord import app_commands
+from asyncio import sleep
+from datetime import datetime, timedelta, timezone
+
+from settings import *
+from storage import open_store, migrate_json_views, index_columns, WriteBehindStore
+from counters import ChannelNameDebouncer
+from roles import RoleAssignmentQueue
+from pool import TicketChannelPool
+from tickets import Ticket, TicketRegistry
+from guilds import GuildConfig, GuildConfigRegistry
+from transcripts import TranscriptArchive
+from analytics import TicketAnalytics, format_duration
+from outbox import AnnouncementOutbox
+from regulations import RegulationsPublisher
+from scheduler import Scheduler
+from dispatcher import Priority, RestDispatcher, RestQueueSaturated, prioritized
+from ratelimit import TokenBucketLimiter
+from metrics import registry, timed, instrument_http, measure_loop_lag, MetricsServer
+from watchdog import LoopWatchdog
+from logs import setup_logging
+
+log_handler = None
+
+_logger = logging.getLogger(__name__)
+
+intents = discord.Intents.default()
+intents.guild_messages = True
+intents.members = True
+intents.message_content = MESSAGE_CONTENT_INTENT
+
+client_options = {}
+if LEAN_MEMBER_CACHE:
+    # Боту нужны только member_count и участники из самих событий, полный список не загружается и не кэшируется
+    client_options.update(chunk_guilds_at_startup=False, member_cache_flags=discord.MemberCacheFlags.none())
+if AUTO_SHARD:
+    client = discord.AutoShardedClient(intents=intents, shard_count=SHARD_COUNT, **client_options)
+else:
+    client = discord.Client(intents=intents, **client_options)
+tree = app_commands.CommandTree(client)
+
+callback_latency = registry.histogram('amaterasu_callback_seconds', 'Время обработки команд и кнопок', ('callback',))
+view_sweep_duration = registry.gauge('amaterasu_view_sweep_seconds', 'Длительность последней проверки сохраненных view')
+loop_lag = registry.gauge('amaterasu_event_loop_lag_seconds', 'Задержка цикла событий')
+instrument_http(
+    client.http,
+    registry.counter('amaterasu_rest_requests_total', 'Запросы к REST API', ('route', 'status')),
+    registry.histogram('amaterasu_rest_request_seconds', 'Длительность запросов к REST API', ('route',)),
+    registry.counter('amaterasu_rest_ratelimits_total', 'Ответы 429 от REST API', ('route',)),
+)
+rest_dispatcher = RestDispatcher(REST_CONCURRENCY, REST_BUCKET_CONCURRENCY, REST_SHED_DEPTH)
+rest_dispatcher.install(client.http)
+
+# Service Functions
+#
+
+store = WriteBehindStore(None, STORE_FLUSH_INTERVAL)
+guild_configs = GuildConfigRegistry(store, GUILDS_FILENAME)
+tickets = TicketRegistry(store, NOTIFICATIONS_FILENAME, TICKETS_FILENAME)
+transcripts = TranscriptArchive(store, TRANSCRIPTS_FILENAME, TRANSCRIPTS_DIR) if TRANSCRIPTS_DIR else None
+ticket_analytics = TicketAnalytics(store, TICKET_STATS_FILENAME, TICKET_STATS_WINDOW, TICKET_STATS_SLOTS)
+scheduler = Scheduler(store, SCHEDULER_FILENAME)
+outbox = AnnouncementOutbox(
+    client,
+    store,
+    OUTBOX_FILENAME,
+    scheduler,
+    retry_delay=OUTBOX_RETRY_DELAY,
+    max_retry_delay=OUTBOX_MAX_RETRY_DELAY,
+    max_attempts=OUTBOX_MAX_ATTEMPTS,
+)
+
+counter_debouncer = ChannelNameDebouncer(
+    client,
+    scheduler,
+    delay=MEMBERS_COUNTER_DELAY,
+    max_delay=MEMBERS_COUNTER_MAX_DELAY,
+    rename_limit=CHANNEL_RENAME_LIMIT,
+    rename_period=CHANNEL_RENAME_PERIOD,
+)
+
+limiter = TokenBucketLimiter(RATE_LIMITS)
+join_roles_queue = RoleAssignmentQueue(
+    concurrency=JOIN_ROLES_CONCURRENCY,
+    max_attempts=JOIN_ROLES_MAX_ATTEMPTS,
+    retry_delay=JOIN_ROLES_RETRY_DELAY,
+)
+
+
+def count_clan_members(guild: discord.Guild, config: GuildConfig) -> int:
+    return sum(1 for member in guild.members if any(role.id in config.clan_member_roles for role in member.roles))
+
+
+def register_counters(config: GuildConfig):
+    if config.members_counter_channel:
+        counter_debouncer.register(config.members_counter_channel, lambda: f'Всего Участников: {client.get_guild(config.guild_id).member_count}')
+    if config.clan_members_counter_channel:
+        counter_debouncer.register(config.clan_members_counter_channel, lambda: f'Участников Клана: {count_clan_members(client.get_guild(config.guild_id), config)}')
+
+
+
+def update_members_counter(config: GuildConfig):
+    if config.members_counter_channel:
+        counter_debouncer.schedule(config.members_counter_channel)
+    update_clan_members_counter(config)
+
+
+def update_clan_members_counter(config: GuildConfig):
+    # Счетчик клана перебирает всех участников, без полного кэша он невозможен
+    if config.clan_member_roles and config.clan_members_counter_channel and not LEAN_MEMBER_CACHE:
+        counter_debouncer.schedule(config.clan_members_counter_channel)
+
+
+async def throttled(i: discord.Interaction, action: str) -> bool:
+    retry_after = limiter.hit(action, i.user.id)
+    if retry_after:
+        await i.response.send_message(f'Слишком часто. Попробуйте снова через {int(retry_after) + 1} сек.', delete_after=15, ephemeral=True)
+    return bool(retry_after)
+
+
+ANNOUNCEMENT_TIMEZONE = timezone(timedelta(hours=ANNOUNCEMENT_UTC_OFFSET))
+
+
+async def announcement_targets(i: discord.Interaction, channel_id: int, publish_at: str | None, crosspost: str | None) -> tuple[list[int], float | None] | None:
+    try:
+        due = datetime.strptime(publish_at, '%Y-%m-%d %H:%M').replace(tzinfo=ANNOUNCEMENT_TIMEZONE).timestamp() if publish_at else None
+    except ValueError:
+        await i.response.send_message('Время публикации должно быть в формате ГГГГ-ММ-ДД ЧЧ:ММ.', delete_after=3, ephemeral=True)
+        return None
+
+    if not channel_id:
+        await i.response.send_message('Канал для этой публикации на сервере не настроен.', delete_after=3, ephemeral=True)
+        return None
+
+    channel_ids = [channel_id]
+    for mention in re.findall(r'<#([0-9]+)>', crosspost or ''):
+        if not isinstance(i.guild.get_channel(int(mention)), discord.TextChannel):
+            await i.response.send_message(f'Канал <#{mention}> не найден.', delete_after=3, ephemeral=True)
+            return None
+        channel_ids.append(int(mention))
+    return list(dict.fromkeys(channel_ids)), due
+
+
+def is_ticket_responder(member: discord.Member, config: GuildConfig) -> bool:
+    return any(role.id in config.tickets_responder_roles for role in getattr(member, 'roles', ()))
+
+
+def responders_mention(config: GuildConfig) -> str:
+    return ' '.join(f'<@&{role}>' for role in config.tickets_responder_roles)
+
+
+def get_notification(ticket: Ticket | None, guild_id: int, notification_id: int = None) -> discord.PartialMessage | None:
+    if notification_id is None and ticket:
+        notification_id = ticket.notification_id
+    if notification_id is None:
+        return None
+    config = guild_configs.get(guild_id)
+    channel_id = ticket and ticket.notification_channel_id or config and config.notifications_channel
+    channel = client.get_channel(channel_id) if channel_id else None
+    return channel.get_partial_message(notification_id) if channel else None
+
+
+def schedule_ticket_timers(channel_id: int):
+    if TICKET_AUTO_CLOSE_AFTER:
+        scheduler.schedule('ticket_auto_close', channel_id, TICKET_AUTO_CLOSE_AFTER)
+    if TICKET_ESCALATION_AFTER:
+        scheduler.schedule('ticket_escalation', channel_id, TICKET_ESCALATION_AFTER)
+
+
+def forget_ticket(channel_id: int) -> Ticket | None:
+    scheduler.cancel('ticket_auto_close', channel_id)
+    scheduler.cancel('ticket_escalation', channel_id)
+    ticket = tickets.remove(channel_id)
+    if ticket:
+        ticket_analytics.forget(ticket)
+    return ticket
+
+
+closing_tickets = set()
+
+
+async def close_ticket(channel: discord.TextChannel, closed_by: int | None, archive: bool = True) -> bool:
+    # Пока переписка сохраняется, повторные нажатия на закрытие того же тикета игнорируются
+    if channel.id in closing_tickets:
+        return False
+    closing_tickets.add(channel.id)
+    ticket = tickets.get(channel.id)
+    try:
+        if transcripts and archive:
+            await transcripts.archive(channel, ticket, closed_by)
+        await channel.delete()
+    finally:
+        closing_tickets.discard(channel.id)
+    if ticket:
+        ticket_analytics.closed(ticket)
+    return True
+
+
+async def confirm_close_ticket(i: discord.Interaction, channel: discord.TextChannel, button_class: type, target_id: int | None, archive: bool) -> bool:
+    try:
+        return await close_ticket(channel, i.user.id, archive)
+    except Exception as e:
+        _logger.error(f'Не удалось закрыть тикет {channel.name}', exc_info=True, extra={'event': 'ticket_close_failed', 'guild': channel.guild.id, 'channel': channel.id, 'user': i.user.id})
+        # Если переписку не удается сохранить (нет доступа к истории, кончилось место), тикет все равно должно быть можно закрыть
+        if archive and transcripts:
+            content = f'Не удалось сохранить переписку, тикет не закрыт: {e}\nЗакрыть его без сохранения переписки?'
+            view = TicketCloseConfirmView(button_class, target_id, force=True)
+        else:
+            content, view = f'Не удалось закрыть тикет: {e}', None
+        await i.edit_original_response(content=content, view=view)
+        return False
+
+
+async def auto_close_ticket(channel_id: int, payload: dict):
+    ticket = tickets.get(channel_id)
+    channel = client.get_channel(channel_id)
+    if channel is None:
+        guild = client.get_guild(ticket.guild_id) if ticket else None
+        if ticket and (guild is None or guild.unavailable):
+            # Канал не виден, потому что сервер недоступен, а не потому что его удалили: повторим позже
+            scheduler.schedule('ticket_auto_close', channel_id, TICKET_AUTO_CLOSE_RETRY_DELAY)
+            return
+    elif not await close_ticket(channel, None):
+        return
+    forget_ticket(channel_id)
+    if ticket and ticket.notification_id:
+        notification = get_notification(ticket, ticket.guild_id)
+        if not notification:
+            return
+        embed = discord.Embed(description='🔐 Тикет закрыт автоматически из-за неактивности', color=INVISIBLE_COLOR)
+        await notification.reply(embed=embed)
+        await notification.edit(view=None)
+
+
+async def escalate_ticket(channel_id: int, payload: dict):
+    channel = client.get_channel(channel_id)
+    if not channel:
+        return
+    embed = discord.Embed(description=f'⏰ На тикет никто не ответил за {TICKET_ESCALATION_AFTER // 60} мин.', color=WARNING_COLOR)
+    await channel.send(responders_mention(guild_configs.get(channel.guild.id)), embed=embed)
+
+
+scheduler.register('ticket_auto_close', auto_close_ticket)
+scheduler.register('ticket_escalation', escalate_ticket)
+
+
+# Views
+#
+
+class TicketNotificationButton(discord.ui.DynamicItem[discord.ui.Button], template=r'amaterasu:notification:(?P<action>close|confirm|force|cancel):(?P<ticket_channel_id>[0-9]+)'):
+    buttons = {
+        'close': dict(label='Закрыть', emoji='🔐', style=discord.ButtonStyle.danger),
+        'confirm': dict(label='Подтвердить', style=discord.ButtonStyle.success),
+        'force': dict(label='Закрыть без сохранения', style=discord.ButtonStyle.danger),
+        'cancel': dict(label='Отменить', style=discord.ButtonStyle.danger),
+    }
+
+    def __init__(self, action: str, ticket_channel_id: int):
+        super().__init__(discord.ui.Button(custom_id=f'amaterasu:notification:{action}:{ticket_channel_id}', **self.buttons[action]))
+        self.action = action
+        self.ticket_channel_id = ticket_channel_id
+
+    @classmethod
+    async def from_custom_id(cls, i: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match['action'], int(match['ticket_channel_id']))
+
+    async def callback(self, i: discord.Interaction):
+        if self.action == 'close':
+            view = TicketCloseConfirmView(TicketNotificationButton, self.ticket_channel_id)
+            await i.response.send_message('Вы уверены что хотите закрыть этот тикет?', view=view, ephemeral=True)
+        elif self.action in ('confirm', 'force'):
+            with callback_latency.time('confirm_close'):
+                channel = i.guild.get_channel(self.ticket_channel_id)
+                if channel and channel.id in closing_tickets:
+                    await i.response.edit_message(content='Тикет уже закрывается.', view=None, delete_after=3)
+                    return
+                # Сохранение переписки занимает время, поэтому результат сообщаем после закрытия канала
+                await i.response.edit_message(content='Тикет закрывается…', view=None)
+                if channel and not await confirm_close_ticket(i, channel, TicketNotificationButton, self.ticket_channel_id, self.action == 'confirm'):
+                    return
+                response = await i.edit_original_response(content='Тикет закрыт.')
+                await response.delete(delay=3)
+                forget_ticket(self.ticket_channel_id)
+                embed = discord.Embed(description=f'🔐 {i.user.mention} закрыл тикет', color=INVISIBLE_COLOR)
+                await i.channel.send(embed=embed)
+        elif self.action == 'cancel':
+            await i.response.edit_message(content='Закрытие тикета отменено.', view=None, delete_after=3)
+
+
+class TicketButton(discord.ui.DynamicItem[discord.ui.Button], template=r'amaterasu:ticket:(?P<action>close|call|confirm|force|cancel)(?::(?P<notification_id>[0-9]+))?'):
+    buttons = {
+        'close': dict(label='Закрыть Тикет', emoji='🔐', style=discord.ButtonStyle.danger),
+        'call': dict(label='Вызвать Руководство', emoji='🔔', style=discord.ButtonStyle.primary),
+        'confirm': dict(label='Подтвердить', style=discord.ButtonStyle.success),
+        'force': dict(label='Закрыть без сохранения', style=discord.ButtonStyle.danger),
+        'cancel': dict(label='Отменить', style=discord.ButtonStyle.danger),
+    }
+
+    def __init__(self, action: str, notification_id: int = None):
+        # Старые кнопки хранят id уведомления, новые находят его по каналу тикета
+        custom_id = f'amaterasu:ticket:{action}' if notification_id is None else f'amaterasu:ticket:{action}:{notification_id}'
+        super().__init__(discord.ui.Button(custom_id=custom_id, **self.buttons[action]))
+        self.action = action
+        self.notification_id = notification_id
+
+    @classmethod
+    async def from_custom_id(cls, i: discord.Interaction, item: discord.ui.Button, match):
+        notification_id = match['notification_id']
+        return cls(match['action'], int(notification_id) if notification_id else None)
+
+    async def callback(self, i: discord.Interaction):
+        if self.action == 'close':
+            view = TicketCloseConfirmView(TicketButton, self.notification_id)
+            await i.response.send_message('Вы уверены что хотите закрыть этот тикет?', view=view, ephemeral=True)
+        elif self.action == 'call':
+            with callback_latency.time('call_team'):
+                if await throttled(i, 'call_team'):
+                    return
+                if ticket := tickets.get(i.channel.id):
+                    ticket_analytics.ping(ticket)
+                embed = discord.Embed(description=f'🔔 {i.user.mention} вызвал Руководство.', color=WARNING_COLOR)
+                with prioritized(Priority.INTERACTION):
+                    await i.channel.send(responders_mention(guild_configs.get(i.guild_id)), embed=embed, delete_after=20)
+                await i.response.defer()
+        elif self.action in ('confirm', 'force'):
+            with callback_latency.time('confirm_close'):
+                await i.response.defer()
+                ticket = tickets.get(i.channel.id)
+                if not await confirm_close_ticket(i, i.channel, TicketButton, self.notification_id, self.action == 'confirm'):
+                    return
+                forget_ticket(i.channel.id)
+                notification = get_notification(ticket, i.guild_id, self.notification_id)
+                if notification:
+                    embed = discord.Embed(description='🔐 Пользователь закрыл этот тикет', color=INVISIBLE_COLOR)
+                    await notification.reply(embed=embed)
+                    await notification.edit(view=None)
+        elif self.action == 'cancel':
+            await i.response.edit_message(content='Закрытие тикета отменено.', view=None, delete_after=3)
+
+
+class TicketCloseConfirmView(discord.ui.View):
+    def __init__(self, button_class: type, target_id: int | None, force: bool = False, *args, **kwargs):
+        super().__init__(timeout=None)
+        self.add_item(button_class('force' if force else 'confirm', target_id))
+        self.add_item(button_class('cancel', target_id))
+
+
+class TicketNotificationView(discord.ui.View):
+    def __init__(self, ticket_channel_id: int, guild_id: int = GUILD, *args, **kwargs):
+        super().__init__(timeout=None)
+        self.add_item(discord.ui.Button(label='Посмотреть', emoji='🔍', url=f'https://discord.com/channels/{guild_id}/{ticket_channel_id}'))
+        self.add_item(TicketNotificationButton('close', ticket_channel_id))
+
+
+class TicketView(discord.ui.View):
+    def __init__(self, *args, **kwargs):
+        super().__init__(timeout=None)
+        self.add_item(TicketButton('close'))
+        self.add_item(TicketButton('call'))
+
+
+TICKET_ALLOW_OVERWRITE = discord.PermissionOverwrite(
+    view_channel=True,
+    read_messages=True,
+    send_messages=True,
+)
+TICKET_DENY_OVERWRITE = discord.PermissionOverwrite(
+    view_channel=False,
+    read_messages=False,
+    send_messages=False,
+)
+ticket_overwrites = {}
+ticket_pools = {}
+
+
+def get_ticket_overwrites(guild: discord.Guild, config: GuildConfig) -> dict:
+    if guild.id not in ticket_overwrites:
+        overwrites = {guild.default_role: TICKET_DENY_OVERWRITE}
+        for role_id in config.tickets_responder_roles:
+            overwrites[guild.get_role(role_id)] = TICKET_ALLOW_OVERWRITE
+        ticket_overwrites[guild.id] = overwrites
+    return ticket_overwrites[guild.id]
+
+
+class TicketFormView(discord.ui.View):
+    def __init__(self, label: str, style: str, channel_prefix: str, *args, **kwargs):
+        super().__init__(timeout=None)
+        self.label = label
+        self.style = discord.ButtonStyle[style]
+        self.channel_prefix = channel_prefix
+        self.add_buttons()
+
+    def add_buttons(self):
+        @timed(callback_latency, 'create_channel')
+        async def create_channel(i: discord.Interaction):
+            config = guild_configs.get(i.guild_id)
+            if not config or not i.guild.get_channel(config.notifications_channel or 0):
+                await i.response.send_message('Тикеты на этом сервере не настроены.', delete_after=3, ephemeral=True)
+                return
+            if not tickets.reserve(i.guild_id, i.user.id, self.channel_prefix):
+                ticket = tickets.get_by_user(i.guild_id, i.user.id, self.channel_prefix)
+                content = f'У вас уже есть открытый тикет <#{ticket.channel_id}>.' if ticket else 'Ваш тикет уже создается.'
+                await i.response.send_message(content, delete_after=15, ephemeral=True)
+                return
+            if await throttled(i, 'create_channel'):
+                tickets.release(i.guild_id, i.user.id, self.channel_prefix)
+                return
+
+            try:
+                channel = await open_ticket(i)
+            except BaseException as e:
+                tickets.release(i.guild_id, i.user.id, self.channel_prefix)
+                # Иначе пользователь видит «думает…», пока не истечет токен взаимодействия
+                if isinstance(e, Exception) and i.response.is_done():
+                    try:
+                        await i.edit_original_response(content='Не удалось создать тикет, попробуйте еще раз позже.')
+                    except discord.HTTPException:
+                        pass
+                raise
+
+            response = await i.edit_original_response(content=f'Канал {channel.mention} создан.')
+            await response.delete(delay=15)
+
+        async def open_ticket(i: discord.Interaction):
+            await i.response.defer(ephemeral=True, thinking=True)
+            guild = i.guild
+            config = guild_configs.get(guild.id)
+            name = f'└┃ {self.channel_prefix}-{i.user.name}'
+            overwrites = {**get_ticket_overwrites(guild, config), i.user: TICKET_ALLOW_OVERWRITE}
+            channel = await ticket_pools[guild.id].claim(name, overwrites)
+            if channel is None:
+                category = guild.get_channel(config.tickets_category)
+                channel = await guild.create_text_channel(name=name, category=category, overwrites=overwrites)
+
+            async def send_notification():
+                notifications = guild.get_channel(config.notifications_channel)
+                notification_view = TicketNotificationView(channel.id, guild.id)
+                notification_embed = discord.Embed(title='Новый Тикет', description=f'{i.user.mention} создал новый Тикет с префиксом {self.channel_prefix}\n\n<#{channel.id}>', color=INVISIBLE_COLOR)
+                notification_embed.set_thumbnail(url=i.user.avatar)
+                return await notifications.send(embed=notification_embed, view=notification_view)
+
+            async def send_ticket_message():
+                embed = discord.Embed(title=f'キヲツケ {i.user.name}!', description='Спасибо за отправку тикета!\nРуководство скоро свяжется с вами.\nПожалуйста, в подробностях распишите суть вашего обращения.\n\nЕсли вам никто не ответил вы можете нажать кнопку `🔔 Вызвать Руководство`', color=INVISIBLE_COLOR)
+                embed.set_thumbnail(url=i.user.avatar)
+                message = await channel.send(i.user.mention, embed=embed, view=TicketView())
+                await message.pin()
+                return message
+
+            # Кнопки тикета не зависят от уведомления, поэтому оба сообщения отправляются параллельно
+            results = await asyncio.gather(send_notification(), send_ticket_message(), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                # Канал без записи в реестре не увидят ни проверка, ни автозакрытие, поэтому убираем все созданное
+                for created in (results[0], channel):
+                    if isinstance(created, (discord.Message, discord.TextChannel)):
+                        try:
+                            await created.delete()
+                        except discord.HTTPException as e:
+                            _logger.error(f'Не удалось удалить остатки несозданного тикета {channel.id}: {e}', extra={'event': 'ticket_create_failed', 'guild': guild.id, 'channel': channel.id})
+                raise errors[0]
+            notification, message = results
+
+            tickets.add(Ticket(
+                channel_id=channel.id,
+                notification_id=notification.id,
+                notification_channel_id=notification.channel.id,
+                message_id=message.id,
+                user_id=i.user.id,
+                prefix=self.channel_prefix,
+                guild_id=guild.id,
+            ))
+            schedule_ticket_timers(channel.id)
+            return channel
+
+        button = discord.ui.Button(label=self.label, style=self.style, custom_id='amaterasu:form:create')
+        button.callback = create_channel
+        self.add_item(button)
+
+# Modals
+#
+
+class OrderModal(discord.ui.Modal):
+    def __init__(self, image_url=None, channel_ids=(), publish_at=None):
+        super().__init__(title='Новый Указ')
+
+        self.name = discord.ui.TextInput(
+            label='Заголовок',
+            min_length=3,
+            max_length=100,
+        )
+        self.add_item(self.name)
+
+        self.url = discord.ui.TextInput(
+            label='URL для заголовка',
+            placeholder='https://',
+            required=False,
+        )
+        self.add_item(self.url)
+
+        self.description = discord.ui.TextInput(
+            label='Описание',
+            style=discord.TextStyle.paragraph,
+            placeholder='Описание',
+            required=True,
+        )
+        self.add_item(self.description)
+
+        self.image_url = image_url
+        self.channel_ids = list(channel_ids)
+        self.publish_at = publish_at
+
+    async def on_submit(self, i: discord.Interaction):
+        embed = discord.Embed(
+            title=f'Указ {self.name}',
+            description=f'{self.description}',
+            timestamp=datetime.fromtimestamp(self.publish_at or time.time(), timezone.utc),
+            color=INVISIBLE_COLOR,
+        )
+        if self.url.value != '':
+            embed.url = self.url.value
+        embed.set_image(url=self.image_url)
+        if not await outbox.submit(i.id, self.channel_ids, embed, self.publish_at):
+            await i.response.send_message('Не удалось сохранить указ, попробуйте еще раз.', delete_after=3, ephemeral=True)
+            return
+        when = f' на <t:{int(self.publish_at)}:f>' if self.publish_at else ''
+        await i.response.send_message(f'Указ {self.name.value} поставлен в очередь публикации{when}.', delete_after=3, ephemeral=True)
+
+
+class NewsModal(discord.ui.Modal):
+    def __init__(self, image_url=None, channel_ids=(), publish_at=None):
+        super().__init__(title='Создание Новости')
+
+        self.name = discord.ui.TextInput(
+            label='Заголовок',
+            min_length=3,
+            max_length=100,
+        )
+        self.add_item(self.name)
+
+        self.url = discord.ui.TextInput(
+            label='URL для заголовка',
+            placeholder='https://',
+            required=False,
+        )
+        self.add_item(self.url)
+
+        self.description = discord.ui.TextInput(
+            label='Описание',
+            style=discord.TextStyle.paragraph,
+            placeholder='Описание',
+            required=True,
+        )
+        self.add_item(self.description)
+
+        self.image_url = image_url
+        self.channel_ids = list(channel_ids)
+        self.publish_at = publish_at
+
+    async def on_submit(self, i: discord.Interaction):
+        embed = discord.Embed(
+            title=f'{self.name}',
+            description=f'{self.description}',
+            timestamp=datetime.fromtimestamp(self.publish_at or time.time(), timezone.utc),
+            color=INVISIBLE_COLOR,
+        )
+        if self.url.value != '':
+            embed.url = self.url.value
+        embed.set_image(url=self.image_url)
+        if not await outbox.submit(i.id, self.channel_ids, embed, self.publish_at):
+            await i.response.send_message('Не удалось сохранить новость, попробуйте еще раз.', delete_after=3, ephemeral=True)
+            return
+        when = f' на <t:{int(self.publish_at)}:f>' if self.publish_at else ''
+        await i.response.send_message(f'Новость {self.name.value} поставлена в очередь публикации{when}.', delete_after=3, ephemeral=True)
+
+
+class SymbolicsModal(discord.ui.Modal):
+    def __init__(self, image_url=None, channel_ids=(), publish_at=None):
+        super().__init__(title='Добавление Символики')
+
+        self.name = discord.ui.TextInput(
+            label='Заголовок',
+            min_length=3,
+            max_length=100,
+        )
+        self.add_item(self.name)
+
+        self.description = discord.ui.TextInput(
+            label='Описание',
+            style=discord.TextStyle.paragraph,
+            placeholder='Описание',
+            required=True,
+        )
+        self.add_item(self.description)
+
+        self.image_url = image_url
+        self.channel_ids = list(channel_ids)
+        self.publish_at = publish_at
+
+    async def on_submit(self, i: discord.Interaction):
+        embed = discord.Embed(
+            title=f'{self.name}',
+            description=f'{self.description}',
+            color=INVISIBLE_COLOR,
+        )
+        embed.set_image(url=self.image_url)
+        if not await outbox.submit(i.id, self.channel_ids, embed, self.publish_at):
+            await i.response.send_message('Не удалось сохранить символику, попробуйте еще раз.', delete_after=3, ephemeral=True)
+            return
+        when = f' на <t:{int(self.publish_at)}:f>' if self.publish_at else ''
+        await i.response.send_message(f'Символика {self.name.value} поставлена в очередь публикации{when}.', delete_after=3, ephemeral=True)
+
+
+# Events
+#
+
+
+
+regulations_publishers = {}
+army_regulations_publishers = {}
+
+
+def register_publishers(config: GuildConfig):
+    if config.regulations_channel:
+        regulations_publishers[config.guild_id] = RegulationsPublisher(
+            client,
+            store,
+            REGULATIONS_FILENAME,
+            config.regulations_path or REGULATIONS_PATH,
+            config.regulations_channel,
+            title=config.regulations_title,
+            footer=config.regulations_footer,
+            color=INVISIBLE_COLOR,
+        )
+    if config.army_regulations_channel:
+        army_regulations_publishers[config.guild_id] = RegulationsPublisher(
+            client,
+            store,
+            REGULATIONS_FILENAME,
+            config.army_regulations_path or ARMY_REGULATIONS_PATH,
+            config.army_regulations_channel,
+            title=config.army_regulations_title,
+            footer=config.army_regulations_footer,
+            color=INVISIBLE_COLOR,
+        )
+
+
+regulations_watch_tasks = []
+
+view_classes = {
+    NOTIFICATIONS_FILENAME: TicketNotificationView,
+    TICKETS_FILENAME: TicketView,
+    TICKET_FORMS_FILENAME: TicketFormView,
+}
+ticket_form_ids = set()
+sweep_task = None
+
+
+def forget_messages(message_ids: list[int]):
+    tickets.discard_messages(message_ids)
+    form_ids = [message_id for message_id in message_ids if message_id in ticket_form_ids]
+    if form_ids:
+        ticket_form_ids.difference_update(form_ids)
+        store.delete(TICKET_FORMS_FILENAME, form_ids)
+
+
+async def restamp_view(view_filename: str, view_class: type, view_data: dict, channel: discord.TextChannel):
+    # Старые сообщения содержат случайные custom_id, перевыпускаем кнопки один раз
+    await channel.get_partial_message(view_data['message_id']).edit(view=view_class(**view_data))
+    store.put(view_filename, {**view_data, 'persistent': True})
+
+
+async def restamp_views():
+    # Старые кнопки не работают, пока не перевыпущены, поэтому их перевыпуск идет отдельным проходом
+    # до размеренной проверки: сообщения разных каналов правятся параллельно, лимиты держит диспетчер
+    restamped = 0
+    for view_filename, view_class in view_classes.items():
+        after = 0
+        while batch := store.page(view_filename, after, SWEEP_BATCH_SIZE):
+            after = batch[-1]['message_id']
+            legacy = []
+            for view_data in batch:
+                if view_data.get('persistent'):
+                    continue
+                guild = client.get_guild(view_data.get('guild_id', GUILD))
+                channel = guild.get_channel(view_data['channel_id']) if guild else None
+                if channel:
+                    legacy.append((view_data, channel))
+            results = await asyncio.gather(*(restamp_view(view_filename, view_class, view_data, channel) for view_data, channel in legacy), return_exceptions=True)
+            # Неудачные записи остаются без отметки, их перевыпустит или удалит общая проверка
+            restamped += sum(1 for result in results if not isinstance(result, BaseException))
+    if restamped:
+        _logger.info(f'Перевыпущены кнопки старых сообщений: {restamped}', extra={'event': 'views_restamped'})
+
+
+async def sweep_views(verify_messages: bool):
+    for view_filename, view_class in view_classes.items():
+        removed = 0
+        after = 0
+        while batch := store.page(view_filename, after, SWEEP_BATCH_SIZE):
+            after = batch[-1]['message_id']
+            views_to_delete = []
+            for view_data in batch:
+                # Пока сервер недоступен, его каналы не видны, и записи нельзя считать устаревшими
+                guild = client.get_guild(view_data.get('guild_id', GUILD))
+                if not guild or guild.unavailable:
+                    continue
+                ticket_channel_id = index_columns(view_data)[1]
+                if ticket_channel_id and not guild.get_channel(ticket_channel_id):
+                    removed += forget_ticket(ticket_channel_id) is not None
+                    continue
+
+                channel = guild.get_channel(view_data['channel_id'])
+                if not channel:
+                    views_to_delete.append(view_data['message_id'])
+                    continue
+                if view_data.get('persistent') and not verify_messages:
+                    continue
+                try:
+                    if view_data.get('persistent'):
+                        await channel.fetch_message(view_data['message_id'])
+                    else:
+                        await restamp_view(view_filename, view_class, view_data, channel)
+                except discord.NotFound:
+                    views_to_delete.append(view_data['message_id'])
+                except RestQueueSaturated:
+                    # Сообщение проверим на следующем проходе
+                    pass
+                except discord.HTTPException as e:
+                    _logger.error(f'Ошибка при проверке сообщения {view_data["message_id"]}: {e}', extra={'event': 'view_audit_error', 'guild': guild.id, 'channel': channel.id})
+                except Exception:
+                    # Сетевая ошибка или битая запись не должны прерывать проверку остальных сообщений
+                    _logger.exception(f'Не удалось проверить сообщение {view_data["message_id"]}', extra={'event': 'view_audit_error', 'guild': guild.id, 'channel': channel.id})
+                await sleep(VIEW_AUDIT_DELAY)
+            forget_messages(views_to_delete)
+            removed += len(views_to_delete)
+            await sleep(0)
+        if removed:
+            _logger.info(f'Проверка {view_filename} завершена, удалено записей: {removed}', extra={'event': 'view_sweep'})
+
+
+async def sweep_views_periodically():
+    await client.wait_until_ready()
+    try:
+        await restamp_views()
+    except Exception:
+        _logger.exception('Ошибка перевыпуска кнопок', extra={'event': 'view_sweep_error'})
+    # Первый проход сверяет сообщения через API, чтобы учесть удаления, пропущенные пока бот был выключен
+    verify_messages = True
+    while not client.is_closed():
+        started = loop_time()
+        # Необработанное исключение молча завершило бы задачу, и проверки прекратились бы до перезапуска бота
+        try:
+            with prioritized(Priority.HOUSEKEEPING):
+                await sweep_views(verify_messages)
+            verify_messages = False
+        except Exception:
+            _logger.exception('Ошибка проверки сохраненных view', extra={'event': 'view_sweep_error'})
+        view_sweep_duration.set(loop_time() - started)
+        await sleep(SWEEP_INTERVAL)
+
+
+def store_size() -> int:
+    return sum(os.path.getsize(path) for path in (STORE_PATH, f'{STORE_PATH}-wal') if os.path.exists(path))
+
+
+def loop_time() -> float:
+    return asyncio.get_running_loop().time()
+
+
+metrics_server = MetricsServer(registry, METRICS_HOST, METRICS_PORT)
+loop_watchdog = LoopWatchdog(WATCHDOG_THRESHOLD, WATCHDOG_TOP) if WATCHDOG_THRESHOLD else None
+background_tasks = []
+registry.gauge('amaterasu_gateway_latency_seconds', 'Задержка heartbeat шлюза', collect=lambda: client.latency)
+registry.gauge('amaterasu_store_size_bytes', 'Размер файла хранилища', collect=store_size)
+registry.gauge('amaterasu_store_flush_seconds', 'Длительность последней записи хранилища на диск', collect=lambda: store.last_flush_duration)
+registry.gauge('amaterasu_open_tickets', 'Открытые тикеты', ('guild',), collect=lambda: {(str(guild_id),): len(guild_tickets) for guild_id, guild_tickets in tickets.by_guild.items()})
+registry.gauge('amaterasu_ticket_first_reply_seconds', 'Время до первого ответа руководства за окно статистики', ('guild', 'quantile'), collect=lambda: {(str(guild_id), str(q)): stats.first_reply.percentile(q, time.time()) or 0 for guild_id, stats in ticket_analytics.guilds.items() for q in (50, 90, 99)})
+registry.gauge('amaterasu_resident_views', 'View, зарегистрированные в клиенте', collect=lambda: len(client.persistent_views))
+registry.gauge('amaterasu_outbox_pending', 'Публикации, ожидающие доставки', collect=lambda: store.count(OUTBOX_FILENAME))
+registry.gauge('amaterasu_scheduled_tasks', 'Отложенные задачи', collect=lambda: len(scheduler))
+registry.gauge('amaterasu_rest_queue_depth', 'Запросы в очереди диспетчера', ('priority',), collect=lambda: {(priority.name.lower(),): depth for priority, depth in rest_dispatcher.depth.items()})
+registry.gauge('amaterasu_rest_queue_wait_max_seconds', 'Максимальное ожидание в очереди диспетчера', ('priority',), collect=lambda: {(priority.name.lower(),): stats['wait_max'] for priority, stats in rest_dispatcher.stats.items()})
+registry.counter('amaterasu_rest_queue_wait_seconds_total', 'Суммарное ожидание в очереди диспетчера', ('priority',), collect=lambda: {(priority.name.lower(),): stats['wait_total'] for priority, stats in rest_dispatcher.stats.items()})
+registry.counter('amaterasu_rest_queue_requests_total', 'Запросы, прошедшие через диспетчер', ('priority',), collect=lambda: {(priority.name.lower(),): stats['requests'] for priority, stats in rest_dispatcher.stats.items()})
+registry.counter('amaterasu_rest_queue_shed_total', 'Запросы, отклоненные при перегрузке', ('priority',), collect=lambda: {(priority.name.lower(),): stats['shed'] for priority, stats in rest_dispatcher.stats.items()})
+registry.counter('amaterasu_throttled_total', 'Действия пользователей, отклоненные ограничителем', ('action',), collect=lambda: {(action,): count for action, count in limiter.throttled.items()})
+registry.counter('amaterasu_loop_stalls_total', 'Зависания цикла событий, пойманные watchdog', collect=lambda: loop_watchdog.stalls if loop_watchdog else 0)
+registry.counter('amaterasu_log_dropped_total', 'Записи лога, отброшенные при переполнении очереди', collect=lambda: log_handler.dropped if log_handler else 0)
+registry.counter('amaterasu_join_roles_total', 'Выдача ролей новым участникам', ('result',), collect=lambda: {(result,): count for result, count in join_roles_queue.stats.items()})
+
+
+def setup():
+    # Файлы и глобальное логирование трогает только запуск, импорт модуля обходится без побочных эффектов
+    global log_handler
+    if TRANSCRIPTS_DIR and not MESSAGE_CONTENT_INTENT:
+        # Без интента Discord присылает сообщения с пустым текстом, и архив сохранял бы пустые переписки
+        raise RuntimeError('Архив тикетов требует MESSAGE_CONTENT_INTENT: включите интент или отключите TRANSCRIPTS_DIR')
+    log_handler = setup_logging(LOG_LEVEL, LOG_JSON, LOG_QUEUE_SIZE, LOG_RATE_LIMIT, LOG_SAMPLING)
+    store_backend = open_store(STORE_BACKEND, STORE_PATH)
+    migrate_json_views(store_backend, LEGACY_DB_DIR, [NOTIFICATIONS_FILENAME, TICKETS_FILENAME, TICKET_FORMS_FILENAME])
+    store.open(store_backend)
+    guild_configs.load(GuildConfig(
+        guild_id=GUILD,
+        tickets_category=TICKETS_CATEGORY,
+        notifications_channel=NOTIFICATIONS_CHANNEL,
+        ticket_forms_channel=TICKET_FORMS_CHANNEL,
+        orders_channel=ORDERS_CHANNEL,
+        news_channel=NEWS_CHANNEL,
+        symbolics_channel=SYMBOLICS_CHANNEL,
+        regulations_channel=REGULATIONS_CHANNEL,
+        army_regulations_channel=ARMY_REGULATIONS_CHANNEL,
+        members_counter_channel=MEMBERS_COUNTER_CHANNEL,
+        clan_members_counter_channel=CLAN_MEBMERS_COUNTER_CHANNEL,
+        admin_roles=ADMIN_ROLES,
+        tickets_responder_roles=TICKETS_RESPONDER_ROLES,
+        join_roles=JOIN_ROLES,
+        clan_member_roles=CLAN_MEMBER_ROLES,
+        regulations_path=REGULATIONS_PATH,
+        army_regulations_path=ARMY_REGULATIONS_PATH,
+        regulations_title=REGULATIONS_TITLE,
+        regulations_footer=REGULATIONS_FOOTER,
+        army_regulations_title=ARMY_REGULATIONS_TITLE,
+        army_regulations_footer=ARMY_REGULATIONS_FOOTER,
+    ))
+    for config in guild_configs:
+        # Команды объявлены глобально, а синхронизируются копиями на каждый настроенный сервер
+        tree.copy_global_to(guild=discord.Object(id=config.guild_id))
+        register_counters(config)
+        register_publishers(config)
+        ticket_pools[config.guild_id] = TicketChannelPool(TICKET_POOL_SIZE, TICKET_POOL_LOW_WATER, TICKET_POOL_NAME)
+    tickets.load(GUILD)
+    if transcripts:
+        transcripts.load()
+    ticket_analytics.load()
+    scheduler.load()
+    outbox.load()
+
+
+@client.event
+async def setup_hook():
+    global sweep_task
+    store.start()
+    scheduler.start(client.wait_until_ready)
+    if loop_watchdog:
+        loop_watchdog.start()
+    # docker stop присылает SIGTERM, закрываем клиента штатно, чтобы сбросить несохраненные записи
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(client.close()))
+    # Кнопки тикетов не хранят состояние, один обработчик обслуживает все сообщения
+    client.add_dynamic_items(TicketNotificationButton, TicketButton)
+    join_roles_queue.start()
+    ticket_forms = store.all(TICKET_FORMS_FILENAME)
+    for view_data in ticket_forms:
+        client.add_view(TicketFormView(**view_data), message_id=view_data['message_id'])
+        ticket_form_ids.add(view_data['message_id'])
+    _logger.info(f'Восстановлено {len(ticket_forms)} форм тикетов', extra={'event': 'views_restored'})
+    sweep_task = asyncio.create_task(sweep_views_periodically())
+    background_tasks.append(asyncio.create_task(ticket_analytics.persist_periodically(TICKET_STATS_PERSIST_INTERVAL)))
+    if METRICS_PORT:
+        await metrics_server.start()
+        background_tasks.append(asyncio.create_task(measure_loop_lag(loop_lag, LOOP_LAG_INTERVAL)))
+    if REGULATIONS_WATCH_INTERVAL:
+        for publisher in (*regulations_publishers.values(), *army_regulations_publishers.values()):
+            regulations_watch_tasks.append(asyncio.create_task(publisher.watch(REGULATIONS_WATCH_INTERVAL)))
+
+
+async def shutdown():
+    # Порядок важен: при выходе asyncio.run отменяет задачи в произвольном порядке, и записи, сделанные
+    # после последнего сброса хранилища, терялись. Сначала останавливаем всех, кто пишет, затем сбрасываем
+    if store.closed:
+        return
+    tasks = [task for task in (sweep_task, *background_tasks, *regulations_watch_tasks) if task]
+    tasks.extend(pool.refill_task for pool in ticket_pools.values() if pool.refill_task)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await scheduler.stop()
+    await join_roles_queue.stop()
+    ticket_analytics.persist()
+    if loop_watchdog:
+        loop_watchdog.stop()
+    await metrics_server.close()
+    await store.flush()
+    store.close()
+    _logger.info('Хранилище сохранено, бот остановлен', extra={'event': 'shutdown'})
+
+
+def commands_hash(guild: discord.Guild) -> str:
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda command: (command['type'], command['name']))
+    return hashlib.sha256(json.dumps([client.application_id, payload], sort_keys=True).encode()).hexdigest()
+
+
+async def sync_commands(guild: discord.Guild):
+    # on_ready приходит после каждого переподключения, а bulk overwrite команд сильно ограничен по частоте
+    digest = commands_hash(guild)
+    synced = store.get(COMMANDS_FILENAME, guild.id)
+    if synced and synced['hash'] == digest:
+        _logger.info(f"Команды сервера {guild.name} не изменились, синхронизация пропущена", extra={'event': 'commands_sync', 'guild': guild.id})
+        return
+
+    started = time.perf_counter()
+    await tree.sync(guild=guild)
+    store.put(COMMANDS_FILENAME, {'message_id': guild.id, 'hash': digest})
+    _logger.info(f"Синхронизация команд завершена для сервера {guild.name}", extra={'event': 'commands_sync', 'guild': guild.id, 'latency': time.perf_counter() - started})
+
+
+@client.event
+async def on_ready():
+    for config in guild_configs:
+        guild = client.get_guild(config.guild_id)
+        if not guild:
+            _logger.error(f"Сервер с ID {config.guild_id} не найден", extra={'event': 'guild_missing', 'guild': config.guild_id})
+            continue
+
+        await sync_commands(guild)
+
+        update_members_counter(config)
+
+        ticket_pool = ticket_pools[guild.id]
+        category = guild.get_channel(config.tickets_category)
+        if ticket_pool.enabled and category:
+            ticket_pool.reconcile(category)
+
+        _logger.info(guild.name)
+
+
+@client.event
+async def on_error(event, *args, **kwargs):
+    # Одна запись на ошибку: трассировку форматирует поток логирования, а ограничитель считает падения по имени события
+    source = args[0] if args else None
+    author = getattr(source, 'author', None) or getattr(source, 'user', None)
+    _logger.error(
+        f"Произошла ошибка в событии: {event}",
+        exc_info=True,
+        extra={
+            'event': event,
+            'guild': getattr(getattr(source, 'guild', None), 'id', None),
+            'channel': getattr(getattr(source, 'channel', None), 'id', None),
+            'user': getattr(author, 'id', None),
+        },
+    )
+
+
+@client.event
+async def on_message(message):
+    if message.author.bot or not (ticket := tickets.get(message.channel.id)):
+        return
+    if TICKET_AUTO_CLOSE_AFTER:
+        scheduler.schedule('ticket_auto_close', message.channel.id, TICKET_AUTO_CLOSE_AFTER)
+    config = guild_configs.get(ticket.guild_id)
+    if is_ticket_responder(message.author, config):
+        scheduler.cancel('ticket_escalation', message.channel.id)
+        if message.channel.category_id == config.tickets_category:
+            ticket_analytics.message(ticket, message.created_at.timestamp())
+
+
+@client.event
+async def on_raw_message_delete(payload):
+    forget_messages([payload.message_id])
+
+
+@client.event
+async def on_raw_bulk_message_delete(payload):
+    forget_messages(list(payload.message_ids))
+
+
+@client.event
+async def on_guild_channel_delete(channel):
+    forget_ticket(channel.id)
+    config = guild_configs.get(channel.guild.id)
+    if not config:
+        return
+    ticket_pools[config.guild_id].discard(channel.id)
+    if channel.id in (config.ticket_forms_channel, config.notifications_channel):
+        forget_messages([view_data['message_id'] for kind in (TICKET_FORMS_FILENAME, NOTIFICATIONS_FILENAME) for view_data in store.find(kind, channel_id=channel.id)])
+
+
+@client.event
+async def on_member_join(member):
+    config = guild_configs.get(member.guild.id)
+    if not config:
+        return
+    if config.join_roles:
+        join_roles_queue.put(member, config.join_roles)
+    update_members_counter(config)
+
+
+@client.event
+async def on_raw_member_remove(payload):
+    # on_member_remove приходит только для участников из кэша
+    config = guild_configs.get(payload.guild_id)
+    if config:
+        update_members_counter(config)
+
+
+@client.event
+async def on_member_update(before, after):
+    config = guild_configs.get(after.guild.id)
+    if config and before.roles != after.roles:
+        changed = {role.id for role in before.roles} ^ {role.id for role in after.roles}
+        if changed.intersection(config.clan_member_roles):
+            update_clan_members_counter(config)
+
+# Commands
+#
+
+@tree.command(name='hello', description='Показывает что бот живой')
+async def hello(i: discord.Interaction):
+    await i.response.send_message(content=f'Hello, {i.user.name}!')
+
+
+@tree.command(name='post_regulations', description='Публикует устав, обновляя только изменившиеся сообщения')
+@timed(callback_latency, 'post_regulations')
+async def post_regulations(i: discord.Interaction):
+    if not i.user.guild_permissions.administrator:
+        await i.response.send_message('У вас недостаточно прав для использования этой команды.', delete_after=3, ephemeral=True)
+        return
+
+    publisher = regulations_publishers.get(i.guild_id)
+    if not publisher:
+        await i.response.send_message('Канал устава для этого сервера не настроен.', delete_after=3, ephemeral=True)
+        return
+
+    await i.response.defer(ephemeral=True)
+    try:
+        message = await publisher.publish()
+    except (OSError, ValueError, LookupError, discord.HTTPException, RestQueueSaturated) as e:
+        _logger.error(f'Не удалось опубликовать {publisher.path}: {e}', extra={'event': 'regulations_error', 'guild': i.guild_id})
+        await i.edit_original_response(content=f'Не удалось опубликовать устав: {e}')
+        return
+    response = await i.edit_original_response(content=f'[Устав]({message.jump_url}) был отправлен.')
+    await response.delete(delay=3)
+
+
+@tree.command(name='post_army_regulations', description='Публикует армейский устав, обновляя только изменившиеся сообщения')
+@timed(callback_latency, 'post_army_regulations')
+async def post_army_regulations(i: discord.Interaction):
+    if not i.user.guild_permissions.administrator:
+        await i.response.send_message('У вас недостаточно прав для использования этой команды.', delete_after=3, ephemeral=True)
+        return
+
+    publisher = army_regulations_publishers.get(i.guild_id)
+    if not publisher:
+        await i.response.send_message('Канал армейского устава для этого сервера не настроен.', delete_after=3, ephemeral=True)
+        return
+
+    await i.response.defer(ephemeral=True)
+    try:
+        message = await publisher.publish()
+    except (OSError, ValueError, LookupError, discord.HTTPException, RestQueueSaturated) as e:
+        _logger.error(f'Не удалось опубликовать {publisher.path}: {e}', extra={'event': 'regulations_error', 'guild': i.guild_id})
+        await i.edit_original_response(content=f'Не удалось опубликовать устав: {e}')
+        return
+    response = await i.edit_original_response(content=f'[Устав]({message.jump_url}) был отправлен.')
+    await response.delete(delay=3)
+
+
+@tree.command(name='post_ticket_form', description='Отправляет новую форму для тикетов')
+@app_commands.choices(style=[
+    app_commands.Choice(name='Primary', value='primary'),
+    app_commands.Choice(name='Secondary', value='secondary'),
+    app_commands.Choice(name='Success', value='success'),
+    app_commands.Choice(name='Danger', value='danger'),
+])
+@timed(callback_latency, 'post_ticket_form')
+async def post_ticket_form(
+        i: discord.Interaction,
+        title: str, description: str,
+        style: app_commands.Choice[str],
+        channel_prefix: str
+):
+    if not i.user.guild_permissions.administrator:
+        await i.response.send_message('У вас недостаточно прав для использования этой команды.', delete_after=3, ephemeral=True)
+        return
+
+    embed = discord.Embed(
+        title=title,
+        description=description,
+        color=INVISIBLE_COLOR,
+    )
+    channel = client.get_channel(guild_configs.get(i.guild_id).ticket_forms_channel or 0)
+    if not channel:
+        await i.response.send_message('Канал форм тикетов для этого сервера не настроен.', delete_after=3, ephemeral=True)
+        return
+
+    form_label = 'Отправить'
+    form_style = discord.ButtonStyle[style.value]
+    form_channel_prefix = channel_prefix
+    view = TicketFormView(label=form_label, style=form_style.name, channel_prefix=form_channel_prefix)
+    with prioritized(Priority.INTERACTION):
+        message = await channel.send(embed=embed, view=view)
+
+    ticket_form_ids.add(message.id)
+    store.put(TICKET_FORMS_FILENAME, {
+        'message_id': message.id,
+        'channel_id': channel.id,
+        'label': form_label,
+        'style': form_style.name,
+        'channel_prefix': form_channel_prefix,
+        'guild_id': i.guild_id,
+        'persistent': True,
+    })
+
+    await i.response.send_message(f'Форма [{title}]({message.jump_url}) была создана.', delete_after=3, ephemeral=True)
+
+
+@tree.command(name='post_order', description='Отправляет новый указ')
+@timed(callback_latency, 'post_order')
+async def post_order(
+    i: discord.Interaction,
+    image_url: str = None,
+    publish_at: str = None,
+    crosspost: str = None,
+):
+    if not i.user.guild_permissions.administrator:
+        await i.response.send_message('У вас недостаточно прав для использования этой команды.', delete_after=3, ephemeral=True)
+        return
+
+    targets = await announcement_targets(i, guild_configs.get(i.guild_id).orders_channel, publish_at, crosspost)
+    if targets is None:
+        return
+
+    modal = OrderModal(image_url, *targets)
+    await i.response.send_modal(modal)
+
+
+@tree.command(name='post_news', description='Отправляет новость')
+@timed(callback_latency, 'post_news')
+async def post_news(
+    i: discord.Interaction,
+    image_url: str = None,
+    publish_at: str = None,
+    crosspost: str = None,
+):
+    if not i.user.guild_permissions.administrator:
+        await i.response.send_message('У вас недостаточно прав для использования этой команды.', delete_after=3, ephemeral=True)
+        return
+
+    targets = await announcement_targets(i, guild_configs.get(i.guild_id).news_channel, publish_at, crosspost)
+    if targets is None:
+        return
+
+    modal = NewsModal(image_url, *targets)
+    await i.response.send_modal(modal)
+
+
+@tree.command(name='post_symbolics', description='Добавляет новую символику')
+@timed(callback_latency, 'post_symbolics')
+async def post_symbolics(
+    i: discord.Interaction,
+    image_url: str = None,
+    publish_at: str = None,
+    crosspost: str = None,
+):
+    if not i.user.guild_permissions.administrator:
+        await i.response.send_message('У вас недостаточно прав для использования этой команды.', delete_after=3, ephemeral=True)
+        return    
+
+    targets = await announcement_targets(i, guild_configs.get(i.guild_id).symbolics_channel, publish_at, crosspost)
+    if targets is None:
+        return
+
+    modal = SymbolicsModal(image_url, *targets)
+    await i.response.send_modal(modal)
+
+
+@tree.command(name='transcripts', description='Ищет архив закрытых тикетов по id тикета, участнику или дате')
+@timed(callback_latency, 'transcripts')
+async def find_transcripts(
+    i: discord.Interaction,
+    ticket: str = None,
+    user: discord.User = None,
+    date: str = None,
+):
+    if not (i.user.guild_permissions.administrator or is_ticket_responder(i.user, guild_configs.get(i.guild_id))):
+        await i.response.send_message('У вас недостаточно прав для использования этой команды.', delete_after=3, ephemeral=True)
+        return
+    if not transcripts:
+        await i.response.send_message('Архив тикетов отключен.', delete_after=3, ephemeral=True)
+        return
+
+    if ticket:
+        record = transcripts.get(int(ticket)) if ticket.isdigit() else None
+        if not record or record['guild_id'] != i.guild_id:
+            await i.response.send_message('Тикет не найден в архиве.', delete_after=3, ephemeral=True)
+            return
+        file = discord.File(transcripts.path(record), filename=f'{record["name"]}-{record["message_id"]}.jsonl.gz')
+        await i.response.send_message(f'Переписка тикета {record["name"]}, сообщений: {record["messages"]}.', file=file, ephemeral=True)
+        return
+
+    try:
+        day = datetime.strptime(date, '%Y-%m-%d').date() if date else None
+    except ValueError:
+        await i.response.send_message('Дата должна быть в формате ГГГГ-ММ-ДД.', delete_after=3, ephemeral=True)
+        return
+
+    records = transcripts.find(i.guild_id, user.id if user else None, day)
+    if not records:
+        await i.response.send_message('Подходящих тикетов в архиве нет.', delete_after=3, ephemeral=True)
+        return
+    lines = [
+        f'<t:{int(record["closed_at"])}:f> `{record["message_id"]}` {record["name"]}'
+        + (f' <@{record["user_id"]}>' if record['user_id'] else '')
+        + f', сообщений: {record["messages"]}'
+        for record in records
+    ]
+    embed = discord.Embed(title='Архив тикетов', description='\n'.join(lines), color=INVISIBLE_COLOR)
+    await i.response.send_message(embed=embed, ephemeral=True)
+
+
+@tree.command(name='ticket_stats', description='Показывает скорость ответа на тикеты')
+@timed(callback_latency, 'ticket_stats')
+async def ticket_stats(i: discord.Interaction):
+    if not (i.user.guild_permissions.administrator or is_ticket_responder(i.user, guild_configs.get(i.guild_id))):
+        await i.response.send_message('У вас недостаточно прав для использования этой команды.', delete_after=3, ephemeral=True)
+        return
+
+    # Все значения берутся из готовых гистограмм, время ответа не зависит от числа тикетов
+    now = time.time()
+    stats = ticket_analytics.get(i.guild_id)
+    embed = discord.Embed(title=f'Тикеты за {TICKET_STATS_WINDOW // (60*60*24)} дн.', color=INVISIBLE_COLOR)
+    for name, histogram in (('Первый ответ руководства', stats.first_reply), ('Время жизни тикета', stats.lifetime), ('Ожидание до вызова руководства', stats.pings)):
+        percentiles = ' / '.join(format_duration(histogram.percentile(q, now)) for q in (50, 90, 99))
+        embed.add_field(name=name, value=f'p50 / p90 / p99: {percentiles}\nВсего: {histogram.count}', inline=False)
+    embed.add_field(name='Открыто без ответа', value=str(max(0, tickets.count(i.guild_id) - len(stats.answered))), inline=False)
+    await i.response.send_message(embed=embed, ephemeral=True)
@@ -0,0 +1,74 @@
+import logging
+import time
+
+from collections import deque
+from typing import Callable
+
+import discord
+
+from dispatcher import Priority, RestQueueSaturated, prioritized
+from scheduler import Scheduler
+
+_logger = logging.getLogger(__name__)
+
+
+class ChannelNameDebouncer:
+    action = 'channel_rename'
+
+    def __init__(self, client: discord.Client, scheduler: Scheduler, delay: float, max_delay: float, rename_limit: int, rename_period: float):
+        self.client = client
+        self.scheduler = scheduler
+        self.delay = delay
+        self.max_delay = max_delay
+        self.rename_limit = rename_limit
+        self.rename_period = rename_period
+        self.renderers: dict[int, Callable[[], str]] = {}
+        self.first_event: dict[int, float] = {}
+        self.last_event: dict[int, float] = {}
+        self.renames: dict[int, deque] = {}
+        scheduler.register(self.action, self.fire)
+
+    def register(self, channel_id: int, render: Callable[[], str]):
+        self.renderers[channel_id] = render
+
+    def schedule(self, channel_id: int):
+        now = time.time()
+        self.first_event.setdefault(channel_id, now)
+        self.last_event[channel_id] = now
+        self.scheduler.schedule(self.action, channel_id, due=self._due(channel_id))
+
+    def _due(self, channel_id: int) -> float:
+        # Ждем затишья, но не дольше max_delay с первого события пачки
+        now = time.time()
+        quiet = self.last_event.get(channel_id, now) + self.delay
+        deadline = self.first_event.get(channel_id, now) + self.max_delay
+        due = min(quiet, deadline)
+
+        renames = self.renames.get(channel_id)
+        if renames and len(renames) >= self.rename_limit:
+            due = max(due, renames[0] + self.rename_period)
+        return due
+
+    async def fire(self, channel_id: int, payload: dict):
+        render = self.renderers.get(channel_id)
+        if render is None:
+            return
+        try:
+            with prioritized(Priority.HOUSEKEEPING):
+                await self.rename(channel_id, render())
+        except RestQueueSaturated:
+            # Бот перегружен, переименование подождет
+            self.scheduler.schedule(self.action, channel_id, self.delay)
+            return
+        except discord.HTTPException as e:
+            _logger.error(f'Не удалось переименовать канал {channel_id}: {e}')
+        self.first_event.pop(channel_id, None)
+
+    async def rename(self, channel_id: int, name: str):
+        channel = self.client.get_channel(channel_id)
+        if not channel or channel.name == name:
+            return
+
+        renames = self.renames.setdefault(channel_id, deque(maxlen=self.rename_limit))
+        renames.append(time.time())
+        await channel.edit(name=name)
@@ -0,0 +1,162 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+
+import discord
+
+_logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    INTERACTION = 0
+    LIFECYCLE = 1
+    ANNOUNCEMENT = 2
+    HOUSEKEEPING = 3
+
+
+class RestQueueSaturated(Exception):
+    pass
+
+
+rest_priority: ContextVar[Priority] = ContextVar('rest_priority', default=Priority.LIFECYCLE)
+
+
+@contextmanager
+def prioritized(priority: Priority):
+    # Приоритет наследуют все запросы и задачи, созданные внутри блока
+    token = rest_priority.set(priority)
+    try:
+        yield
+    finally:
+        rest_priority.reset(token)
+
+
+class RestDispatcher:
+    def __init__(self, concurrency: int, bucket_concurrency: int, shed_depth: int):
+        self.concurrency = concurrency
+        self.bucket_concurrency = bucket_concurrency
+        self.shed_depth = shed_depth
+        # Один слот всегда остается за ответами на взаимодействия
+        self.reserved = 1 if concurrency > 1 else 0
+        self.active = 0
+        self.waiters: list[tuple[int, int, asyncio.Future]] = []
+        self.counter = itertools.count()
+        self.buckets: dict[str, asyncio.Semaphore] = {}
+        self.bucket_users: dict[str, int] = {}
+        self.depth = dict.fromkeys(Priority, 0)
+        self.stats = {
+            priority: {
+                'requests': 0,
+                'shed': 0,
+                'wait_total': 0.0,
+                'wait_max': 0.0,
+            }
+            for priority in Priority
+        }
+        self.saturated = False
+
+    def install(self, http: discord.http.HTTPClient):
+        request = http.request
+
+        async def dispatch(route: discord.http.Route, **kwargs):
+            return await self.submit(f'{route.key}:{route.major_parameters}', lambda: request(route, **kwargs))
+
+        http.request = dispatch
+
+    @property
+    def queued(self) -> int:
+        return sum(self.depth.values())
+
+    def _limit(self, priority: Priority) -> int:
+        return self.concurrency if priority == Priority.INTERACTION else self.concurrency - self.reserved
+
+    async def _acquire(self, priority: Priority):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), future))
+        self.depth[priority] += 1
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        finally:
+            self.depth[priority] -= 1
+
+    def _release(self):
+        self.active -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.active < self._limit(self.waiters[0][0]):
+            priority, seq, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue
+            self.active += 1
+            future.set_result(None)
+
+    def _bucket(self, bucket: str) -> asyncio.Semaphore:
+        self.bucket_users[bucket] = self.bucket_users.get(bucket, 0) + 1
+        return self.buckets.setdefault(bucket, asyncio.Semaphore(self.bucket_concurrency))
+
+    def _leave_bucket(self, bucket: str):
+        self.bucket_users[bucket] -= 1
+        if not self.bucket_users[bucket]:
+            del self.bucket_users[bucket]
+            del self.buckets[bucket]
+
+    def _shed(self, priority: Priority) -> bool:
+        saturated = self.queued >= self.shed_depth
+        if saturated != self.saturated:
+            self.saturated = saturated
+            if saturated:
+                _logger.warning(f'Очередь запросов переполнена ({self.queued}), фоновые запросы откладываются')
+            else:
+                _logger.info('Очередь запросов разгружена')
+        return saturated and priority == Priority.HOUSEKEEPING
+
+    async def submit(self, bucket: str, request):
+        priority = rest_priority.get()
+        stats = self.stats[priority]
+        if self._shed(priority):
+            stats['shed'] += 1
+            raise RestQueueSaturated(bucket)
+
+        started = time.perf_counter()
+        semaphore = self._bucket(bucket)
+        try:
+            async with semaphore:
+                await self._acquire(priority)
+                try:
+                    wait = time.perf_counter() - started
+                    stats['requests'] += 1
+                    stats['wait_total'] += wait
+                    stats['wait_max'] = max(stats['wait_max'], wait)
+                    return await request()
+                finally:
+                    self._release()
+        finally:
+            self._leave_bucket(bucket)
+
+    def snapshot(self) -> dict:
+        return {
+            'active': self.active,
+            'queued': self.queued,
+            'priorities': {
+                priority.name.lower(): {
+                    'depth': self.depth[priority],
+                    'requests': stats['requests'],
+                    'shed': stats['shed'],
+                    'wait_avg': stats['wait_total'] / stats['requests'] if stats['requests'] else 0.0,
+                    'wait_max': stats['wait_max'],
+                }
+                for priority, stats in self.stats.items()
+            },
+        }
@@ -0,0 +1,94 @@
+import json
+import logging
+import sys
+
+from dataclasses import asdict, dataclass, fields
+
+from storage import ViewStore, open_store
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GuildConfig:
+    guild_id: int
+    tickets_category: int | None = None
+    notifications_channel: int | None = None
+    ticket_forms_channel: int | None = None
+    orders_channel: int | None = None
+    news_channel: int | None = None
+    symbolics_channel: int | None = None
+    regulations_channel: int | None = None
+    army_regulations_channel: int | None = None
+    members_counter_channel: int | None = None
+    clan_members_counter_channel: int | None = None
+    admin_roles: tuple[int, ...] = ()
+    tickets_responder_roles: tuple[int, ...] = ()
+    join_roles: tuple[int, ...] = ()
+    clan_member_roles: tuple[int, ...] = ()
+    regulations_path: str | None = None
+    army_regulations_path: str | None = None
+    regulations_title: str = 'Устав'
+    regulations_footer: str | None = None
+    army_regulations_title: str = 'Армейский устав'
+    army_regulations_footer: str | None = None
+
+    @classmethod
+    def from_record(cls, record: dict) -> 'GuildConfig':
+        names = {field.name for field in fields(cls)}
+        # В хранилище id сервера лежит в ключе записи, а кортежи ролей - списками
+        values = {name: tuple(value) if isinstance(value, list) else value for name, value in record.items() if name in names}
+        values['guild_id'] = record.get('guild_id', record.get('message_id'))
+        return cls(**values)
+
+    def to_record(self) -> dict:
+        return {'message_id': self.guild_id, **asdict(self)}
+
+
+class GuildConfigRegistry:
+    def __init__(self, store: ViewStore, kind: str):
+        self.store = store
+        self.kind = kind
+        self.configs: dict[int, GuildConfig] = {}
+
+    def __len__(self) -> int:
+        return len(self.configs)
+
+    def __iter__(self):
+        return iter(list(self.configs.values()))
+
+    def load(self, default: GuildConfig | None = None):
+        self.configs = {record['message_id']: GuildConfig.from_record(record) for record in self.store.all(self.kind)}
+        # Основной сервер настраивается через settings.py, запись в хранилище его переопределяет
+        if default and default.guild_id not in self.configs:
+            self.configs[default.guild_id] = default
+
+    def get(self, guild_id: int | None) -> GuildConfig | None:
+        return self.configs.get(guild_id)
+
+    def put(self, config: GuildConfig):
+        self.configs[config.guild_id] = config
+        self.store.put(self.kind, config.to_record())
+
+    def remove(self, guild_id: int):
+        self.configs.pop(guild_id, None)
+        self.store.delete(self.kind, [guild_id])
+
+
+if __name__ == '__main__':
+    from settings import STORE_BACKEND, STORE_PATH, GUILDS_FILENAME
+
+    logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler(sys.stdout)])
+    if len(sys.argv) != 2:
+        raise SystemExit('Использование: python guilds.py guilds.json')
+
+    # Файл - список объектов с полями GuildConfig, бот подхватит их при следующем запуске
+    with open(sys.argv[1]) as file:
+        records = json.load(file)
+    store = open_store(STORE_BACKEND, STORE_PATH)
+    registry = GuildConfigRegistry(store, GUILDS_FILENAME)
+    for record in records:
+        config = GuildConfig.from_record(record)
+        registry.put(config)
+        _logger.info(f'Сохранена конфигурация сервера {config.guild_id}')
+    store.close()
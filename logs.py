@@ -0,0 +1,94 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import time
+
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+FIELDS = ('event', 'guild', 'channel', 'user', 'latency')
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, limit: int, period: float, sampling: dict[str, float]):
+        super().__init__()
+        self.limit = limit
+        self.period = period
+        self.sampling = sampling
+        self.windows: dict[str, tuple[float, int, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Тип события - явное поле event или место вызова, так цикл падений одного обработчика не вытеснит остальные логи
+        key = getattr(record, 'event', None) or f'{record.module}:{record.lineno}'
+        rate = self.sampling.get(key)
+        if rate is not None and random.random() >= rate:
+            return False
+
+        now = time.monotonic()
+        started, count, suppressed = self.windows.get(key, (now, 0, 0))
+        if now - started >= self.period:
+            if suppressed:
+                record.msg = f'{record.msg} (пропущено похожих записей: {suppressed})'
+            started, count, suppressed = now, 0, 0
+        if count >= self.limit:
+            self.windows[key] = (started, count, suppressed + 1)
+            return False
+        self.windows[key] = (started, count + 1, suppressed)
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Форматирование, включая трассировку, выполняет поток записи, здесь только фиксируем текст сообщения
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Медленный stdout не должен останавливать цикл событий, лишние записи теряем
+            self.dropped += 1
+
+
+def setup_logging(level: str, json_lines: bool, queue_size: int, rate_limit: tuple[int, float], sampling: dict[str, float]) -> DroppingQueueHandler:
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if json_lines else logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(RateLimitFilter(*rate_limit, sampling))
+    listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return handler
@@ -0,0 +1,220 @@
+import asyncio
+import functools
+import logging
+import math
+import time
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+import discord
+
+from aiohttp import web
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+current_route: ContextVar[str | None] = ContextVar('current_route', default=None)
+
+
+def format_labels(names: tuple[str, ...], values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), collect: Callable[[], float | dict] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+        # Значение может считаться в момент опроса, чтобы не обновлять его на горячем пути
+        self.collect = collect
+
+    def collected(self) -> dict[tuple, float]:
+        if self.collect is None:
+            return self.values
+        values = self.collect()
+        return values if isinstance(values, dict) else {(): values}
+
+    def samples(self) -> list[str]:
+        return [f'{self.name}{format_labels(self.labels, labels)} {format_value(value)}' for labels, value in self.collected().items()]
+
+    def render(self) -> str:
+        return '\n'.join([
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+            *self.samples(),
+        ])
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = (*buckets, float('inf'))
+        self.series: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels):
+        counts, total = self.series.setdefault(labels, ([0] * len(self.buckets), [0.0]))
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = format_labels(self.labels, labels, f'le="{format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.labels, labels)} {format_value(total[0])}')
+            lines.append(f'{self.name}_count{format_labels(self.labels, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple[str, ...] = (), collect: Callable[[], float | dict] = None) -> Counter:
+        return self.register(Counter(name, documentation, labels, collect))
+
+    def gauge(self, name: str, documentation: str, labels: tuple[str, ...] = (), collect: Callable[[], float | dict] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, collect))
+
+    def histogram(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        blocks = []
+        for metric in self.metrics.values():
+            try:
+                blocks.append(metric.render())
+            except Exception as e:
+                _logger.error(f'Не удалось собрать метрику {metric.name}: {e}')
+        return '\n'.join(blocks) + '\n'
+
+
+registry = Registry()
+
+
+def timed(histogram: Histogram, *labels):
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with histogram.time(*labels):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateLimitCounter(logging.Handler):
+    # discord.py обрабатывает 429 сам и сообщает о них только в лог
+    def __init__(self, counter: Counter):
+        super().__init__(logging.WARNING)
+        self.counter = counter
+
+    def emit(self, record: logging.LogRecord):
+        if 'responded with 429' in str(record.msg):
+            self.counter.inc(current_route.get() or 'unknown')
+
+
+def instrument_http(http: discord.http.HTTPClient, requests: Counter, latency: Histogram, ratelimits: Counter):
+    request = http.request
+
+    async def instrumented(route: discord.http.Route, **kwargs):
+        token = current_route.set(route.key)
+        status = 'ok'
+        started = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        except discord.HTTPException as e:
+            status = str(e.status)
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started, route.key)
+            requests.inc(route.key, status)
+            current_route.reset(token)
+
+    http.request = instrumented
+    logging.getLogger('discord.http').addHandler(RateLimitCounter(ratelimits))
+
+
+async def measure_loop_lag(gauge: Gauge, interval: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        gauge.set(max(0.0, loop.time() - expected))
+
+
+class MetricsServer:
+    def __init__(self, registry: Registry, host: str, port: int):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.runner: web.AppRunner | None = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        _logger.info(f'Метрики доступны на http://{self.host}:{self.port}/metrics')
+
+    async def close(self):
+        if self.runner:
+            await self.runner.cleanup()
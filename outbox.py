@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+from dispatcher import Priority, prioritized
+from scheduler import Scheduler
+from storage import ViewStore
+
+_logger = logging.getLogger(__name__)
+
+
+class AnnouncementOutbox:
+    action = 'announcement'
+
+    def __init__(self, client: discord.Client, store: ViewStore, kind: str, scheduler: Scheduler, retry_delay: float, max_retry_delay: float, max_attempts: int):
+        self.client = client
+        self.store = store
+        self.kind = kind
+        self.scheduler = scheduler
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        scheduler.register(self.action, self.fire)
+
+    def load(self):
+        # Планировщик удаляет задачу перед запуском, а запись outbox живет до доставки: поднимаем потерянные при падении
+        for record in self.store.all(self.kind):
+            if self.scheduler.get(self.action, record['message_id']) is None:
+                self.scheduler.schedule(self.action, record['message_id'], due=record['due'])
+
+    async def submit(self, entry_id: int, channel_ids: list[int], embed: discord.Embed, due: float = None) -> bool:
+        record = {
+            'message_id': entry_id,
+            'channels': channel_ids,
+            'embed': embed.to_dict(),
+            'due': due or time.time(),
+            'sent': {},
+            'failed': [],
+            'attempt': 0,
+        }
+        self.store.put(self.kind, record)
+        self.scheduler.schedule(self.action, entry_id, due=record['due'])
+        # Пользователю отвечаем только после записи на диск, иначе падение до сброса хранилища теряет публикацию
+        if await self.store.flush():
+            return True
+        self.scheduler.cancel(self.action, entry_id)
+        self.store.delete(self.kind, [entry_id])
+        return False
+
+    async def deliver(self, channel_id: int, embed: discord.Embed) -> discord.Message:
+        channel = self.client.get_channel(channel_id)
+        if channel is None:
+            raise LookupError(f'канал {channel_id} не найден')
+        with prioritized(Priority.ANNOUNCEMENT):
+            message = await channel.send(embed=embed)
+            if channel.is_news():
+                try:
+                    await message.publish()
+                except discord.HTTPException as e:
+                    _logger.error(f'Не удалось опубликовать {message.id} для подписчиков канала {channel_id}: {e}')
+        return message
+
+    async def fire(self, entry_id: int, payload: dict):
+        record = self.store.get(self.kind, entry_id)
+        if record is None:
+            return
+        # Запись из хранилища может в этот момент сериализоваться в потоке записи, меняем только копию
+        record = {**record, 'sent': dict(record['sent']), 'failed': list(record['failed'])}
+        embed = discord.Embed.from_dict(record['embed'])
+        pending = [channel_id for channel_id in record['channels'] if str(channel_id) not in record['sent'] and channel_id not in record['failed']]
+
+        # Разные каналы - разные лимиты Discord, поэтому отправляем во все сразу
+        results = await asyncio.gather(*(self.deliver(channel_id, embed) for channel_id in pending), return_exceptions=True)
+        retry_after = 0
+        retry = False
+        for channel_id, result in zip(pending, results):
+            if isinstance(result, discord.Message):
+                record['sent'][str(channel_id)] = result.id
+            elif isinstance(result, discord.RateLimited):
+                retry = True
+                retry_after = max(retry_after, result.retry_after)
+            elif isinstance(result, discord.HTTPException) and (result.status == 429 or result.status >= 500):
+                retry = True
+                _logger.warning(f'Публикация {entry_id} в канал {channel_id} не удалась, повторим: {result}', extra={'event': 'outbox_retry', 'channel': channel_id})
+            elif isinstance(result, (discord.HTTPException, LookupError)):
+                record['failed'].append(channel_id)
+                _logger.error(f'Публикация {entry_id} в канал {channel_id} отменена: {result}', extra={'event': 'outbox_failed', 'channel': channel_id})
+            else:
+                retry = True
+                _logger.error(f'Ошибка публикации {entry_id} в канал {channel_id}', exc_info=result, extra={'event': 'outbox_error', 'channel': channel_id})
+
+        record['attempt'] += 1
+        if not retry:
+            self.store.delete(self.kind, [entry_id])
+            _logger.info(
+                f'Публикация {entry_id} доставлена в {len(record["sent"])} из {len(record["channels"])} каналов',
+                extra={'event': 'outbox_delivered', 'latency': time.time() - record['due']},
+            )
+            return
+        if record['attempt'] >= self.max_attempts:
+            self.store.delete(self.kind, [entry_id])
+            _logger.error(f'Публикация {entry_id} не доставлена после {record["attempt"]} попыток', extra={'event': 'outbox_failed'})
+            return
+
+        delay = max(retry_after, min(self.retry_delay * 2 ** (record['attempt'] - 1), self.max_retry_delay))
+        record['due'] = time.time() + delay
+        self.store.put(self.kind, record)
+        self.scheduler.schedule(self.action, entry_id, due=record['due'])
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+from collections import deque
+
+import discord
+
+from dispatcher import Priority, RestQueueSaturated, prioritized
+
+_logger = logging.getLogger(__name__)
+
+
+class TicketChannelPool:
+    def __init__(self, size: int, low_water: int, name: str):
+        self.size = size
+        self.low_water = low_water
+        self.name = name
+        self.channels: deque[discord.TextChannel] = deque()
+        self.category: discord.CategoryChannel | None = None
+        self.refill_task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def reconcile(self, category: discord.CategoryChannel):
+        # После рестарта пул собирается из скрытых каналов категории, но только один раз: при переподключении
+        # канал, который сейчас выдается в claim(), еще носит в кэше имя пула и попал бы в очередь повторно
+        first = self.category is None
+        self.category = category
+        if first:
+            self.channels = deque(channel for channel in category.text_channels if channel.name == self.name)
+            _logger.info(f'В пуле тикетов {len(self.channels)} каналов')
+        self.schedule_refill()
+
+    def schedule_refill(self):
+        if not self.enabled or self.category is None:
+            return
+        if len(self.channels) >= self.low_water:
+            return
+        if self.refill_task is None or self.refill_task.done():
+            self.refill_task = asyncio.create_task(self.refill())
+
+    async def refill(self):
+        guild = self.category.guild
+        overwrites = {guild.default_role: discord.PermissionOverwrite(view_channel=False)}
+        while len(self.channels) < self.size:
+            try:
+                with prioritized(Priority.HOUSEKEEPING):
+                    channel = await guild.create_text_channel(name=self.name, category=self.category, overwrites=overwrites)
+            except RestQueueSaturated:
+                return
+            except discord.HTTPException as e:
+                _logger.error(f'Не удалось пополнить пул тикетов: {e}')
+                return
+            self.channels.append(channel)
+
+    def discard(self, channel_id: int):
+        for channel in self.channels:
+            if channel.id == channel_id:
+                self.channels.remove(channel)
+                self.schedule_refill()
+                return
+
+    async def claim(self, name: str, overwrites: dict) -> discord.TextChannel | None:
+        while self.channels:
+            channel = self.channels.popleft()
+            self.schedule_refill()
+            try:
+                # Имя и права выставляются одним запросом
+                return await channel.edit(name=name, overwrites=overwrites) or channel
+            except discord.NotFound:
+                continue
+        self.schedule_refill()
+        return None
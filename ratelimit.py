@@ -0,0 +1,41 @@
+import time
+
+
+class TokenBucketLimiter:
+    def __init__(self, limits: dict[str, tuple[int, float]], prune_size: int = 10000):
+        # action -> (емкость, период полного восстановления в секундах)
+        self.limits = limits
+        self.prune_size = prune_size
+        self.prune_at = prune_size
+        self.buckets: dict[tuple[str, int], tuple[float, float]] = {}
+        self.throttled = dict.fromkeys(limits, 0)
+
+    def hit(self, action: str, key: int) -> float:
+        # 0, если действие разрешено, иначе сколько секунд осталось ждать
+        limit = self.limits.get(action)
+        if limit is None:
+            return 0.0
+        capacity, period = limit
+        rate = capacity / period
+        now = time.monotonic()
+
+        tokens, updated = self.buckets.get((action, key), (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self.buckets[(action, key)] = (tokens, now)
+            self.throttled[action] += 1
+            return (1 - tokens) / rate
+
+        self.buckets[(action, key)] = (tokens - 1, now)
+        if len(self.buckets) > self.prune_at:
+            self.prune(now)
+        return 0.0
+
+    def prune(self, now: float):
+        # Полностью восстановленные корзины ничем не отличаются от отсутствующих
+        self.buckets = {
+            (action, key): (tokens, updated)
+            for (action, key), (tokens, updated) in self.buckets.items()
+            if now - updated < self.limits[action][1]
+        }
+        self.prune_at = max(self.prune_size, 2 * len(self.buckets))
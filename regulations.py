@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import logging
+
+from pathlib import Path
+
+import discord
+
+from dispatcher import Priority, prioritized
+from storage import ViewStore
+
+_logger = logging.getLogger(__name__)
+
+
+EMBED_FIELDS = 25
+EMBED_CHARS = 6000
+FIELD_VALUE_CHARS = 1024
+MESSAGE_EMBEDS = 10
+MESSAGE_CHARS = 6000
+
+RULE_SEPARATOR = '━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━'
+
+
+def text_length(text: str) -> int:
+    # Discord считает символы в UTF-16, как JavaScript
+    return len(text.encode('utf-16-le')) // 2
+
+
+def rule_fields(k: str, v: dict) -> list[tuple[str, str, bool]]:
+    description = v['description']
+    chunks = [description[start:start + FIELD_VALUE_CHARS] for start in range(0, len(description), FIELD_VALUE_CHARS)] or ['\u200B']
+    fields = [(f"[{k}]", f"{v['title']}", True)]
+    fields += [('━━━━', chunk, True) for chunk in chunks]
+    fields.append((RULE_SEPARATOR, '\u200B', False))
+    return fields
+
+
+def pack_embeds(groups: list[list[tuple[str, str, bool]]], title: str, footer: str | None, color: int) -> list[list[discord.Embed]]:
+    # Группы полей (правила) не разрываются между embed, embed набираются жадно в порядке следования:
+    # для упорядоченной упаковки это дает минимальное число embed и сообщений
+    pages = [[discord.Embed(title=title, color=color)]]
+    embed_chars = message_chars = text_length(title)
+    footer_chars = text_length(footer or '')
+
+    def fits(count: int, chars: int) -> bool:
+        return len(pages[-1][-1].fields) + count <= EMBED_FIELDS and embed_chars + chars <= EMBED_CHARS and message_chars + chars <= MESSAGE_CHARS
+
+    def start_embed(chars: int):
+        nonlocal embed_chars, message_chars
+        if len(pages[-1]) >= MESSAGE_EMBEDS or message_chars + chars > MESSAGE_CHARS:
+            pages.append([])
+            message_chars = 0
+        pages[-1].append(discord.Embed(color=color))
+        embed_chars = 0
+
+    def add_field(name: str, value: str, inline: bool, chars: int):
+        nonlocal embed_chars, message_chars
+        pages[-1][-1].add_field(name=name, value=value, inline=inline)
+        embed_chars += chars
+        message_chars += chars
+
+    for number, fields in enumerate(groups):
+        sizes = [text_length(name) + text_length(value) for name, value, inline in fields]
+        # Подпись ставится в последний embed, поэтому место под нее занимает последнее правило
+        reserve = footer_chars if number == len(groups) - 1 else 0
+        chars = sum(sizes) + reserve
+        whole = len(fields) <= EMBED_FIELDS and chars <= min(EMBED_CHARS, MESSAGE_CHARS)
+        if whole and not fits(len(fields), chars) and pages[-1][-1].fields:
+            start_embed(chars)
+        if fits(len(fields), chars):
+            for (name, value, inline), size in zip(fields, sizes):
+                add_field(name, value, inline, size)
+            continue
+
+        # Правило не помещается целиком: продолжение переносится в следующие embed, без пустых embed с одним заголовком
+        for index, ((name, value, inline), size) in enumerate(zip(fields, sizes)):
+            needed = size + (reserve if index == len(fields) - 1 else 0)
+            if not fits(1, needed):
+                start_embed(needed)
+            add_field(name, value, inline, size)
+
+    if footer:
+        pages[-1][-1].set_footer(text=footer)
+    return pages
+
+
+def render_rules(rules: dict, title: str, footer: str | None, color: int) -> list[list[discord.Embed]]:
+    return pack_embeds([rule_fields(k, v) for k, v in rules.items()], title, footer, color)
+
+
+def embeds_hash(embeds: list[discord.Embed]) -> str:
+    return hashlib.sha256(json.dumps([embed.to_dict() for embed in embeds], sort_keys=True).encode()).hexdigest()
+
+
+class RegulationsPublisher:
+    def __init__(self, client: discord.Client, store: ViewStore, kind: str, path: str, channel_id: int, title: str, footer: str | None, color: int):
+        self.client = client
+        self.store = store
+        self.kind = kind
+        self.path = Path(path)
+        self.channel_id = channel_id
+        self.title = title
+        self.footer = footer
+        self.color = color
+        self.digest = None
+        self.pages: list[list[discord.Embed]] = []
+        self.mtime = None
+        self.lock = asyncio.Lock()
+
+    async def render(self) -> list[list[discord.Embed]]:
+        data = await asyncio.to_thread(self.path.read_bytes)
+        digest = hashlib.sha256(data).hexdigest()
+        # Пересобираем embed только если файл действительно изменился
+        if digest != self.digest:
+            self.pages = render_rules(json.loads(data), self.title, self.footer, self.color)
+            self.digest = digest
+        return self.pages
+
+    async def publish(self) -> discord.PartialMessage:
+        async with self.lock:
+            with prioritized(Priority.ANNOUNCEMENT):
+                return await self._publish()
+
+    async def _publish(self) -> discord.PartialMessage:
+        channel = self.client.get_channel(self.channel_id)
+        if channel is None:
+            raise LookupError(f'канал {self.channel_id} не найден')
+        pages = await self.render()
+        published = sorted(self.store.find(self.kind, channel_id=channel.id), key=lambda record: record['position'])
+        if not published:
+            # Первая публикация: убираем сообщения, отправленные до появления учета
+            await channel.purge()
+
+        message_ids = []
+        for position, embeds in enumerate(pages):
+            digest = embeds_hash(embeds)
+            record = published[position] if position < len(published) else None
+            if record and record['hash'] == digest:
+                message_ids.append(record['message_id'])
+                continue
+
+            if record:
+                try:
+                    await channel.get_partial_message(record['message_id']).edit(embeds=embeds)
+                except discord.NotFound:
+                    # Сообщение удалили вручную, порядок восстанавливаем переотправкой хвоста
+                    await self._delete(channel, published[position:])
+                    published = published[:position]
+                    record = None
+
+            if record:
+                message_id = record['message_id']
+            else:
+                message_id = (await channel.send(embeds=embeds)).id
+            self.store.put(self.kind, {
+                'message_id': message_id,
+                'channel_id': channel.id,
+                'position': position,
+                'hash': digest,
+            })
+            message_ids.append(message_id)
+
+        await self._delete(channel, published[len(pages):])
+        return channel.get_partial_message(message_ids[0])
+
+    async def _delete(self, channel: discord.TextChannel, records: list[dict]):
+        for record in records:
+            try:
+                await channel.get_partial_message(record['message_id']).delete()
+            except discord.NotFound:
+                pass
+        self.store.delete(self.kind, [record['message_id'] for record in records])
+
+    async def watch(self, interval: float):
+        await self.client.wait_until_ready()
+        while not self.client.is_closed():
+            try:
+                mtime = (await asyncio.to_thread(self.path.stat)).st_mtime
+                if self.mtime is not None and mtime != self.mtime:
+                    _logger.info(f'{self.path} изменен, публикуем заново')
+                    await self.publish()
+                self.mtime = mtime
+            except (OSError, ValueError, LookupError, discord.HTTPException) as e:
+                _logger.error(f'Не удалось опубликовать {self.path}: {e}')
+            await asyncio.sleep(interval)
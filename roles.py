@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+import discord
+
+_logger = logging.getLogger(__name__)
+
+
+class RoleAssignmentQueue:
+    def __init__(self, concurrency: int, max_attempts: int, retry_delay: float):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.workers: list[asyncio.Task] = []
+        self.retries: set[asyncio.Task] = set()
+        self.stats = {
+            'assigned': 0,
+            'retried': 0,
+            'failed': 0,
+            'skipped': 0,
+        }
+
+    def start(self):
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        tasks = [*self.workers, *self.retries]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def put(self, member: discord.Member, role_ids: tuple[int, ...], attempt: int = 1):
+        self.queue.put_nowait((member, role_ids, attempt))
+
+    async def retry(self, member: discord.Member, role_ids: tuple[int, ...], attempt: int):
+        await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+        self.put(member, role_ids, attempt + 1)
+
+    async def refresh(self, member: discord.Member, attempt: int) -> discord.Member:
+        # Объект из события устаревает, пока участник ждет в очереди. При повторе или без кэша участников берем роли из API
+        if attempt == 1:
+            cached = member.guild.get_member(member.id)
+            if cached is not None:
+                return cached
+        return await member.guild.fetch_member(member.id)
+
+    async def worker(self):
+        while True:
+            member, role_ids, attempt = await self.queue.get()
+            try:
+                # atomic=False - это не добавление, а перезапись всего списка ролей одним PATCH.
+                # Список строим из текущих ролей участника прямо перед запросом, иначе роли,
+                # выданные после входа (верификация, модераторы), были бы сняты
+                member = await self.refresh(member, attempt)
+                missing = [discord.Object(id=role_id) for role_id in role_ids if member.get_role(role_id) is None]
+                if missing:
+                    await member.add_roles(*missing, atomic=False)
+                self.stats['assigned'] += 1
+            except discord.NotFound:
+                self.stats['skipped'] += 1
+            except discord.HTTPException as e:
+                if attempt < self.max_attempts:
+                    self.stats['retried'] += 1
+                    task = asyncio.create_task(self.retry(member, role_ids, attempt))
+                    self.retries.add(task)
+                    task.add_done_callback(self.retries.discard)
+                else:
+                    self.stats['failed'] += 1
+                    _logger.error(
+                        f'Не удалось выдать роли участнику {member.id} после {attempt} попыток: {e}',
+                        extra={'event': 'join_roles_failed', 'guild': member.guild.id, 'user': member.id},
+                    )
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from typing import Awaitable, Callable
+
+from storage import ViewStore
+
+_logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    def __init__(self, store: ViewStore, kind: str):
+        self.store = store
+        self.kind = kind
+        self.heap: list[tuple[float, int, str, int]] = []
+        self.entries: dict[tuple[str, int], tuple[float, int, dict]] = {}
+        self.handlers: dict[str, Callable[[int, dict], Awaitable]] = {}
+        self.counter = itertools.count()
+        self.wakeup: asyncio.Event | None = None
+        self.task: asyncio.Task | None = None
+        self.running: set[asyncio.Task] = set()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _kind(self, action: str) -> str:
+        return f'{self.kind}:{action}'
+
+    def register(self, action: str, handler: Callable[[int, dict], Awaitable]):
+        self.handlers[action] = handler
+        if self.loaded:
+            self._load(action)
+
+    def load(self):
+        # Задачи переживают рестарт: поднимаем сохраненные записи всех зарегистрированных действий
+        self.loaded = True
+        for action in self.handlers:
+            self._load(action)
+
+    def _load(self, action: str):
+        for record in self.store.all(self._kind(action)):
+            self._push(action, record['message_id'], record['due'], record.get('payload', {}))
+
+    def start(self, ready: Callable[[], Awaitable] = None):
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self.run(ready))
+
+    async def stop(self):
+        tasks = [task for task in (self.task, *self.running) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _push(self, action: str, target_id: int, due: float, payload: dict):
+        seq = next(self.counter)
+        self.entries[(action, target_id)] = (due, seq, payload)
+        heapq.heappush(self.heap, (due, seq, action, target_id))
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            # Перенесенные задачи оставляют в куче устаревшие записи, периодически пересобираем ее
+            self.heap = [(due, seq, action, target_id) for (action, target_id), (due, seq, payload) in self.entries.items()]
+            heapq.heapify(self.heap)
+        if self.wakeup and self.heap[0][1] == seq:
+            self.wakeup.set()
+
+    def schedule(self, action: str, target_id: int, delay: float = None, *, due: float = None, payload: dict = None):
+        due = due if due is not None else time.time() + delay
+        payload = payload or {}
+        self._push(action, target_id, due, payload)
+        self.store.put(self._kind(action), {'message_id': target_id, 'due': due, 'payload': payload})
+
+    def cancel(self, action: str, target_id: int):
+        # Запись в куче остается и будет пропущена при извлечении
+        if self.entries.pop((action, target_id), None):
+            self.store.delete(self._kind(action), [target_id])
+
+    def get(self, action: str, target_id: int) -> float | None:
+        entry = self.entries.get((action, target_id))
+        return entry[0] if entry else None
+
+    async def run(self, ready: Callable[[], Awaitable] = None):
+        # Задачи, просроченные за время простоя, ждут загрузки серверов: до этого их каналов нет в кэше
+        if ready:
+            await ready()
+        while True:
+            self.wakeup.clear()
+            now = time.time()
+            while self.heap and self.heap[0][0] <= now:
+                due, seq, action, target_id = heapq.heappop(self.heap)
+                entry = self.entries.get((action, target_id))
+                if entry is None or entry[1] != seq:
+                    continue
+                del self.entries[(action, target_id)]
+                self.store.delete(self._kind(action), [target_id])
+                task = asyncio.create_task(self.fire(action, target_id, entry[2]))
+                self.running.add(task)
+                task.add_done_callback(self.running.discard)
+
+            timeout = self.heap[0][0] - now if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def fire(self, action: str, target_id: int, payload: dict):
+        handler = self.handlers.get(action)
+        if handler is None:
+            _logger.warning(f'Нет обработчика для отложенной задачи {action}')
+            return
+        try:
+            await handler(target_id, payload)
+        except Exception:
+            _logger.exception(f'Ошибка отложенной задачи {action} для {target_id}')
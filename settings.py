@@ -2,14 +2,41 @@ import os
 
 REGULATIONS_PATH = 'regulations.json'
 ARMY_REGULATIONS_PATH = 'army_regulations.json'
+REGULATIONS_TITLE = 'Устав клана Асакура [ 朝倉家憲章 ]'
+REGULATIONS_FOOTER = 'Ваше членство в клане подразумевает принятие этого устава, включая все дальнейшие его изменения. Устав может быть изменен в любое время без уведомления, ваша ответственность — знать о них.'
+ARMY_REGULATIONS_TITLE = 'Устав Национального Полка клана Асакура [ 国立朝倉連隊憲章 ]'
+ARMY_REGULATIONS_FOOTER = 'Данный устав относится исключительно к военному положению и не применяется в мирное время.'
+REGULATIONS_WATCH_INTERVAL = 0
 
 NOTIFICATIONS_FILENAME = 'notifications'
 TICKETS_FILENAME = 'tickets'
 TICKET_FORMS_FILENAME = 'ticket_forms'
+REGULATIONS_FILENAME = 'regulations'
+SCHEDULER_FILENAME = 'scheduled'
+COMMANDS_FILENAME = 'commands'
+GUILDS_FILENAME = 'guilds'
+TRANSCRIPTS_FILENAME = 'transcripts'
+TICKET_STATS_FILENAME = 'ticket_stats'
+OUTBOX_FILENAME = 'outbox'
+
+STORE_BACKEND = 'sqlite'
+STORE_PATH = 'db/amaterasu.sqlite3'
+LEGACY_DB_DIR = 'db'
+STORE_FLUSH_INTERVAL = 1
+VIEW_AUDIT_DELAY = 1
+SWEEP_INTERVAL = 60*60
+SWEEP_BATCH_SIZE = 100
+# Архив переписки закрытых тикетов, None - каналы удаляются без сохранения
+TRANSCRIPTS_DIR = 'db/transcripts'
 
 TOKEN = os.getenv("TOKEN")
+# Основной сервер, остальные серверы добавляются в хранилище через guilds.py
 GUILD = 730393851524808764
 
+# Все шарды в одном процессе через AutoShardedClient, SHARD_COUNT = None - число шардов выбирает Discord
+AUTO_SHARD = False
+SHARD_COUNT = None
+
 # Colors
 #
 
@@ -27,6 +54,11 @@ STATUS_ROLE = 877240157542170684
 ACHIEVEMENTS_ROLE = 877238290871373855
 TECH_ROLE = 877242944103530547
 
+# Color Override, Status, Achievements и Tech категории
+JOIN_ROLES = (COLOR_OVERRIDE_ROLE, STATUS_ROLE, ACHIEVEMENTS_ROLE, TECH_ROLE)
+
+CLAN_MEMBER_ROLES = ()
+
 # Channels
 #
 
@@ -42,3 +74,78 @@ NEWS_CHANNEL = 1331353827017752688
 SYMBOLICS_CHANNEL = 1331353039868788776
 REGULATIONS_CHANNEL = 1331355456605650964
 ARMY_REGULATIONS_CHANNEL = 1076969784182325410
+
+# Members
+#
+
+JOIN_ROLES_CONCURRENCY = 2
+JOIN_ROLES_MAX_ATTEMPTS = 3
+JOIN_ROLES_RETRY_DELAY = 5
+
+# Не загружать и не кэшировать список участников; счетчик клана в этом режиме отключен
+LEAN_MEMBER_CACHE = False
+# Нужен архиву тикетов (TRANSCRIPTS_DIR): без него текст сообщений приходит пустым, и бот не запустится
+MESSAGE_CONTENT_INTENT = True
+
+MEMBERS_COUNTER_DELAY = 60
+MEMBERS_COUNTER_MAX_DELAY = 60*10
+CHANNEL_RENAME_LIMIT = 2
+CHANNEL_RENAME_PERIOD = 60*10
+
+# Tickets
+#
+
+TICKET_POOL_SIZE = 0
+TICKET_POOL_LOW_WATER = 2
+TICKET_POOL_NAME = 'ticket-pool'
+TICKET_AUTO_CLOSE_AFTER = None
+TICKET_AUTO_CLOSE_RETRY_DELAY = 60*5
+TICKET_ESCALATION_AFTER = None
+
+# Статистика ответов по тикетам за скользящее окно, разбитое на слоты
+TICKET_STATS_WINDOW = 60*60*24*30
+TICKET_STATS_SLOTS = 30
+TICKET_STATS_PERSIST_INTERVAL = 60
+
+# Announcements
+#
+
+# Повторы публикаций указов, новостей и символики: задержка удваивается до OUTBOX_MAX_RETRY_DELAY
+OUTBOX_RETRY_DELAY = 5
+OUTBOX_MAX_RETRY_DELAY = 60*10
+OUTBOX_MAX_ATTEMPTS = 10
+# Часовой пояс времени отложенной публикации, часы от UTC
+ANNOUNCEMENT_UTC_OFFSET = 3
+
+# Rate Limits
+#
+
+REST_CONCURRENCY = 8
+REST_BUCKET_CONCURRENCY = 2
+REST_SHED_DEPTH = 50
+
+# Действие: (сколько раз, за сколько секунд) на одного пользователя
+RATE_LIMITS = {
+    'create_channel': (3, 60*10),
+    'call_team': (1, 60*5),
+}
+
+# Logging & Monitoring
+#
+
+# Логи пишет фоновый поток; LOG_RATE_LIMIT - (записей, за сколько секунд) на один тип события
+LOG_LEVEL = 'INFO'
+LOG_JSON = False
+LOG_QUEUE_SIZE = 10000
+LOG_RATE_LIMIT = (20, 60)
+# Тип события: доля записей, которая попадет в лог
+LOG_SAMPLING = {}
+
+# Порт для /metrics в формате Prometheus, None - отключено
+METRICS_PORT = None
+METRICS_HOST = '127.0.0.1'
+LOOP_LAG_INTERVAL = 1
+
+# Порог зависания цикла событий в секундах, None - watchdog отключен
+WATCHDOG_THRESHOLD = None
+WATCHDOG_TOP = 5
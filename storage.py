@@ -0,0 +1,310 @@
+import abc
+import asyncio
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+_logger = logging.getLogger(__name__)
+
+
+def index_columns(record: dict) -> tuple[int | None, int | None]:
+    ticket_channel_id = record.get('ticket_channel_id')
+    if ticket_channel_id is None and 'notification_id' in record:
+        # Сообщение тикета лежит в самом канале тикета
+        ticket_channel_id = record['channel_id']
+    return record.get('channel_id'), ticket_channel_id
+
+
+class ViewStore(abc.ABC):
+    def put(self, kind: str, record: dict):
+        self.put_many(kind, [record])
+
+    def put_many(self, kind: str, records: list[dict]):
+        self.apply({kind: {record['message_id']: record for record in records}})
+
+    def delete(self, kind: str, message_ids: list[int]):
+        if message_ids:
+            self.apply({kind: dict.fromkeys(message_ids)})
+
+    @abc.abstractmethod
+    def apply(self, changes: dict[str, dict[int, dict | None]]):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get(self, kind: str, message_id: int) -> dict | None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def all(self, kind: str) -> list[dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def page(self, kind: str, after: int, limit: int) -> list[dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def find(self, kind: str, *, channel_id: int = None, ticket_channel_id: int = None) -> list[dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def count(self, kind: str) -> int:
+        raise NotImplementedError
+
+    async def flush(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+
+class SQLiteViewStore(ViewStore):
+    SCHEMA = (
+        '''
+        CREATE TABLE IF NOT EXISTS views (
+            kind TEXT NOT NULL,
+            message_id INTEGER NOT NULL,
+            channel_id INTEGER,
+            ticket_channel_id INTEGER,
+            data TEXT NOT NULL,
+            PRIMARY KEY (kind, message_id)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS views_channel_id ON views (channel_id)',
+        'CREATE INDEX IF NOT EXISTS views_ticket_channel_id ON views (ticket_channel_id)',
+    )
+
+    def __init__(self, path: str):
+        file_path = Path(path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(file_path, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+        # Чтения из цикла событий идут через свое соединение: в режиме WAL они видят последний коммит и не ждут транзакцию записи
+        self.read_lock = threading.Lock()
+        self.reader = sqlite3.connect(f'{file_path.resolve().as_uri()}?mode=ro', uri=True, isolation_level=None, check_same_thread=False)
+
+    def apply(self, changes: dict[str, dict[int, dict | None]]):
+        rows = []
+        deleted = []
+        for kind, records in changes.items():
+            for message_id, record in records.items():
+                if record is None:
+                    deleted.append((kind, message_id))
+                else:
+                    rows.append((kind, message_id, *index_columns(record), json.dumps(record)))
+        # Все изменения пачки попадают на диск одной транзакцией
+        with self.lock, self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany('DELETE FROM views WHERE kind = ? AND message_id = ?', deleted)
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO views (kind, message_id, channel_id, ticket_channel_id, data) VALUES (?, ?, ?, ?, ?)',
+                rows,
+            )
+
+    def _query(self, sql: str, parameters: tuple) -> list[tuple]:
+        with self.read_lock:
+            return self.reader.execute(sql, parameters).fetchall()
+
+    def get(self, kind: str, message_id: int) -> dict | None:
+        rows = self._query('SELECT data FROM views WHERE kind = ? AND message_id = ?', (kind, message_id))
+        return json.loads(rows[0][0]) if rows else None
+
+    def all(self, kind: str) -> list[dict]:
+        rows = self._query('SELECT data FROM views WHERE kind = ? ORDER BY message_id', (kind,))
+        return [json.loads(data) for data, in rows]
+
+    def page(self, kind: str, after: int, limit: int) -> list[dict]:
+        rows = self._query('SELECT data FROM views WHERE kind = ? AND message_id > ? ORDER BY message_id LIMIT ?', (kind, after, limit))
+        return [json.loads(data) for data, in rows]
+
+    def find(self, kind: str, *, channel_id: int = None, ticket_channel_id: int = None) -> list[dict]:
+        if channel_id is not None:
+            rows = self._query('SELECT data FROM views WHERE channel_id = ? AND kind = ?', (channel_id, kind))
+        elif ticket_channel_id is not None:
+            rows = self._query('SELECT data FROM views WHERE ticket_channel_id = ? AND kind = ?', (ticket_channel_id, kind))
+        else:
+            raise ValueError('find() требует channel_id или ticket_channel_id')
+        return [json.loads(data) for data, in rows]
+
+    def count(self, kind: str) -> int:
+        return self._query('SELECT COUNT(*) FROM views WHERE kind = ?', (kind,))[0][0]
+
+    def close(self):
+        with self.read_lock:
+            self.reader.close()
+        with self.lock:
+            self.connection.close()
+
+
+class WriteBehindStore(ViewStore):
+    def __init__(self, backend: ViewStore | None, flush_interval: float):
+        # Хранилище можно создать без файла и подключить его позже через open(), чтобы импорт модуля ничего не открывал
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.pending: dict[str, dict[int, dict | None]] = {}
+        self.flushing: dict[str, dict[int, dict | None]] = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='store-writer')
+        self.dirty: asyncio.Event | None = None
+        self.task: asyncio.Task | None = None
+        self.last_flush_duration = 0.0
+        self.closed = False
+        # Сброс вызывает не только фоновая задача, но и код, которому нужна запись на диске до ответа
+        self.flush_lock = asyncio.Lock()
+
+    def open(self, backend: ViewStore):
+        self.backend = backend
+
+    def start(self):
+        self.dirty = asyncio.Event()
+        if self.pending:
+            self.dirty.set()
+        self.task = asyncio.create_task(self.writer())
+
+    def apply(self, changes: dict[str, dict[int, dict | None]]):
+        if self.closed:
+            raise RuntimeError('Хранилище уже закрыто, изменения не будут сохранены')
+        # Изменения копятся в памяти, повторные записи одного сообщения схлопываются
+        for kind, records in changes.items():
+            self.pending.setdefault(kind, {}).update(records)
+        if self.dirty:
+            self.dirty.set()
+
+    def _overlay(self, kind: str) -> dict[int, dict | None]:
+        return {**self.flushing.get(kind, {}), **self.pending.get(kind, {})}
+
+    def get(self, kind: str, message_id: int) -> dict | None:
+        overlay = self._overlay(kind)
+        if message_id in overlay:
+            return overlay[message_id]
+        return self.backend.get(kind, message_id)
+
+    def all(self, kind: str) -> list[dict]:
+        records = {record['message_id']: record for record in self.backend.all(kind)}
+        for message_id, record in self._overlay(kind).items():
+            if record is None:
+                records.pop(message_id, None)
+            else:
+                records[message_id] = record
+        return [records[message_id] for message_id in sorted(records)]
+
+    def page(self, kind: str, after: int, limit: int) -> list[dict]:
+        # Новые записи попадут в страницы после ближайшего сброса на диск
+        overlay = self._overlay(kind)
+        while stored := self.backend.page(kind, after, limit):
+            records = [overlay.get(record['message_id'], record) for record in stored]
+            records = [record for record in records if record is not None]
+            if records:
+                return records
+            after = stored[-1]['message_id']
+        return []
+
+    def find(self, kind: str, *, channel_id: int = None, ticket_channel_id: int = None) -> list[dict]:
+        records = {record['message_id']: record for record in self.backend.find(kind, channel_id=channel_id, ticket_channel_id=ticket_channel_id)}
+        for message_id, record in self._overlay(kind).items():
+            records.pop(message_id, None)
+            if record is None:
+                continue
+            record_channel_id, record_ticket_channel_id = index_columns(record)
+            if (channel_id is not None and record_channel_id == channel_id) or (channel_id is None and record_ticket_channel_id == ticket_channel_id):
+                records[message_id] = record
+        return list(records.values())
+
+    def count(self, kind: str) -> int:
+        count = self.backend.count(kind)
+        for message_id, record in self._overlay(kind).items():
+            stored = self.backend.get(kind, message_id) is not None
+            count += (record is not None) - stored
+        return count
+
+    async def writer(self):
+        # Последний сброс делает не отмена этой задачи, а явная остановка: flush() и close() после остальных задач
+        while True:
+            await self.dirty.wait()
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> bool:
+        async with self.flush_lock:
+            if self.dirty:
+                self.dirty.clear()
+            if not self.pending:
+                return True
+            self.flushing, self.pending = self.pending, {}
+            started = time.perf_counter()
+            try:
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.backend.apply, self.flushing)
+            except Exception as e:
+                _logger.error(f'Не удалось сохранить изменения, повтор при следующей записи: {e}')
+                for kind, records in self.flushing.items():
+                    self.pending[kind] = {**records, **self.pending.get(kind, {})}
+                if self.dirty:
+                    self.dirty.set()
+                return False
+            else:
+                self.last_flush_duration = time.perf_counter() - started
+                return True
+            finally:
+                self.flushing = {}
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.task:
+            self.task.cancel()
+        # Дожидаемся записи в потоке и синхронно сбрасываем остаток при остановке
+        self.executor.shutdown(wait=True)
+        changes = {kind: {**self.flushing.get(kind, {}), **self.pending.get(kind, {})} for kind in {*self.flushing, *self.pending}}
+        self.flushing, self.pending = {}, {}
+        if self.backend is None:
+            return
+        if changes:
+            self.backend.apply(changes)
+        self.backend.close()
+
+
+STORE_BACKENDS = {
+    'sqlite': SQLiteViewStore,
+}
+
+
+def open_store(backend: str, path: str) -> ViewStore:
+    try:
+        store_class = STORE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f'Неизвестное хранилище: {backend}') from None
+    return store_class(path)
+
+
+def migrate_json_views(store: ViewStore, db_dir: str, kinds: list[str]):
+    for kind in kinds:
+        file_path = Path(db_dir) / f'{kind}.json'
+        if not file_path.exists():
+            continue
+        try:
+            text = file_path.read_text()
+            records = json.loads(text) if text.strip() else []
+        except json.JSONDecodeError as e:
+            _logger.error(f'Не удалось перенести {file_path}: {e}. Файл оставлен без изменений')
+            continue
+        store.put_many(kind, records)
+        file_path.rename(file_path.with_name(f'{file_path.name}.migrated'))
+        _logger.info(f'Перенесено {len(records)} записей из {file_path}')
+
+
+if __name__ == '__main__':
+    from settings import STORE_BACKEND, STORE_PATH, LEGACY_DB_DIR, NOTIFICATIONS_FILENAME, TICKETS_FILENAME, TICKET_FORMS_FILENAME
+
+    logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler(sys.stdout)])
+    store = open_store(STORE_BACKEND, STORE_PATH)
+    migrate_json_views(store, LEGACY_DB_DIR, [NOTIFICATIONS_FILENAME, TICKETS_FILENAME, TICKET_FORMS_FILENAME])
+    store.close()
@@ -0,0 +1,52 @@
+import unittest
+
+from analytics import BOUNDS, RollingHistogram
+
+
+class RollingHistogramTest(unittest.TestCase):
+    def setUp(self):
+        self.histogram = RollingHistogram(window=100, slots=10)
+
+    def test_percentiles(self):
+        self.assertIsNone(self.histogram.percentile(50, 0))
+        for value in range(1, 101):
+            self.histogram.observe(value, 0)
+
+        self.assertEqual(self.histogram.count, 100)
+        for q, value in ((50, 50), (90, 90), (99, 99), (100, 100)):
+            estimate = self.histogram.percentile(q, 0)
+            # Ответ - верхняя граница корзины: не меньше точного значения и не больше чем на шаг корзин
+            self.assertGreaterEqual(estimate, value)
+            self.assertLess(estimate, value * 2 ** (1 / 4))
+        self.assertEqual(self.histogram.percentile(0, 0), 1)
+
+    def test_values_beyond_last_bound(self):
+        self.histogram.observe(BOUNDS[-1] * 10, 0)
+        self.assertEqual(self.histogram.percentile(50, 0), BOUNDS[-1])
+
+    def test_rotation_drops_old_slots(self):
+        self.histogram.observe(1000, 5)
+        self.histogram.observe(1, 55)
+        self.assertEqual(self.histogram.percentile(99, 99), self.histogram.percentile(99, 0))
+
+        # Слот с t=5 выходит из окна целиком, как только окно сдвигается за его границу
+        self.assertEqual(self.histogram.percentile(99, 105), 1)
+        self.assertEqual(self.histogram.count, 1)
+
+        self.assertIsNone(self.histogram.percentile(50, 155))
+        self.assertEqual(self.histogram.count, 0)
+        self.assertEqual(sum(self.histogram.totals), 0)
+
+    def test_record_round_trip(self):
+        for now in range(0, 100, 7):
+            self.histogram.observe(now + 1, now)
+        restored = RollingHistogram(window=100, slots=10)
+        restored.load(self.histogram.to_record())
+
+        self.assertEqual(restored.count, self.histogram.count)
+        self.assertEqual(restored.totals, self.histogram.totals)
+        self.assertEqual(restored.percentile(90, 150), self.histogram.percentile(90, 150))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from unittest import mock
+
+from ratelimit import TokenBucketLimiter
+
+
+class TokenBucketLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('ratelimit.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = TokenBucketLimiter({'ticket': (2, 10)}, prune_size=4)
+
+    def test_burst_then_throttle(self):
+        self.assertEqual(self.limiter.hit('ticket', 1), 0)
+        self.assertEqual(self.limiter.hit('ticket', 1), 0)
+        self.assertAlmostEqual(self.limiter.hit('ticket', 1), 5)
+        self.assertEqual(self.limiter.hit('ticket', 2), 0)
+        self.assertEqual(self.limiter.throttled, {'ticket': 1})
+
+    def test_tokens_refill_over_time(self):
+        self.limiter.hit('ticket', 1)
+        self.limiter.hit('ticket', 1)
+        self.now += 2
+        self.assertAlmostEqual(self.limiter.hit('ticket', 1), 3)
+        self.now += 3
+        self.assertEqual(self.limiter.hit('ticket', 1), 0)
+        self.assertGreater(self.limiter.hit('ticket', 1), 0)
+
+    def test_unknown_action_is_not_limited(self):
+        for _ in range(10):
+            self.assertEqual(self.limiter.hit('other', 1), 0)
+        self.assertEqual(self.limiter.buckets, {})
+
+    def test_prune_drops_refilled_buckets(self):
+        for key in range(5):
+            self.limiter.hit('ticket', key)
+        # Свежие корзины пережили очистку, порог вырос, чтобы не чистить на каждом вызове
+        self.assertEqual(len(self.limiter.buckets), 5)
+        self.assertEqual(self.limiter.prune_at, 10)
+
+        self.now += 10
+        for key in range(5, 11):
+            self.limiter.hit('ticket', key)
+        self.assertEqual(sorted(key for _, key in self.limiter.buckets), [5, 6, 7, 8, 9, 10])
+        self.assertEqual(self.limiter.prune_at, 12)
+
+        self.now += 5
+        self.limiter.prune(self.now)
+        self.assertEqual(len(self.limiter.buckets), 6)
+        self.assertEqual(self.limiter.prune_at, 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
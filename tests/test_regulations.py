@@ -0,0 +1,60 @@
+import unittest
+
+from regulations import EMBED_CHARS, EMBED_FIELDS, MESSAGE_CHARS, MESSAGE_EMBEDS, pack_embeds, render_rules, rule_fields, text_length
+
+
+def embed_length(embed) -> int:
+    chars = text_length(embed.title or '') + text_length(embed.footer.text or '')
+    return chars + sum(text_length(field.name) + text_length(field.value) for field in embed.fields)
+
+
+class PackEmbedsTest(unittest.TestCase):
+    def assert_within_limits(self, pages):
+        for embeds in pages:
+            self.assertLessEqual(len(embeds), MESSAGE_EMBEDS)
+            self.assertLessEqual(sum(embed_length(embed) for embed in embeds), MESSAGE_CHARS)
+            for embed in embeds:
+                self.assertLessEqual(len(embed.fields), EMBED_FIELDS)
+                self.assertLessEqual(embed_length(embed), EMBED_CHARS)
+                self.assertTrue(embed.fields, 'embed без полей')
+
+    def fields(self, pages) -> list[tuple[str, str, bool]]:
+        return [(field.name, field.value, field.inline) for embeds in pages for embed in embeds for field in embed.fields]
+
+    def test_oversized_rule_is_split(self):
+        rules = {'1': {'title': 'Правило', 'description': 'x' * 7000}}
+        pages = render_rules(rules, 'Устав', 'Подпись', 0)
+
+        self.assert_within_limits(pages)
+        self.assertEqual(pages[0][0].title, 'Устав')
+        self.assertEqual(pages[-1][-1].footer.text, 'Подпись')
+        self.assertEqual(self.fields(pages), rule_fields('1', rules['1']))
+
+    def test_oversized_rule_between_small_ones(self):
+        rules = {str(k): {'title': 'Правило', 'description': 'x' * (7000 if k == 2 else 100)} for k in range(1, 4)}
+        pages = render_rules(rules, 'Устав', 'Подпись', 0)
+
+        self.assert_within_limits(pages)
+        self.assertEqual(self.fields(pages), [field for k, v in rules.items() for field in rule_fields(k, v)])
+
+    def test_field_limit(self):
+        groups = [[(f'{group}-{index}', 'x', True) for index in range(5)] for group in range(5)]
+        pages = pack_embeds(groups, 'Устав', 'Подпись', 0)
+        self.assertEqual([[len(embed.fields) for embed in embeds] for embeds in pages], [[25]])
+
+        pages = pack_embeds(groups + [[('6', 'x', True)] * 5], 'Устав', 'Подпись', 0)
+        self.assertEqual([[len(embed.fields) for embed in embeds] for embeds in pages], [[25, 5]])
+        self.assertEqual(pages[-1][-1].footer.text, 'Подпись')
+
+    def test_embed_limit(self):
+        groups = [[(f'{group}-{index}', 'x', True) for index in range(EMBED_FIELDS)] for group in range(MESSAGE_EMBEDS)]
+        pages = pack_embeds(groups, 'Устав', 'Подпись', 0)
+        self.assertEqual([len(embeds) for embeds in pages], [10])
+
+        pages = pack_embeds(groups + [[('11', 'x', True)]], 'Устав', 'Подпись', 0)
+        self.assertEqual([len(embeds) for embeds in pages], [10, 1])
+        self.assert_within_limits(pages)
+
+
+if __name__ == '__main__':
+    unittest.main()
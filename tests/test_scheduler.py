@@ -0,0 +1,109 @@
+import asyncio
+import tempfile
+import time
+import unittest
+
+from pathlib import Path
+
+from scheduler import Scheduler
+from storage import SQLiteViewStore, WriteBehindStore
+
+
+class SchedulerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = WriteBehindStore(SQLiteViewStore(str(Path(directory.name) / 'views.sqlite3')), 60)
+        self.addCleanup(self.store.close)
+        self.fired = []
+        self.scheduler = self.create_scheduler()
+
+    def create_scheduler(self) -> Scheduler:
+        scheduler = Scheduler(self.store, 'scheduler')
+
+        async def handler(target_id: int, payload: dict):
+            self.fired.append((target_id, payload))
+
+        scheduler.register('close', handler)
+        return scheduler
+
+    async def run_scheduler(self, ready=None):
+        self.scheduler.start(ready)
+        self.addAsyncCleanup(self.scheduler.stop)
+        await asyncio.sleep(0.05)
+
+    async def test_due_tasks_fire_once(self):
+        self.scheduler.schedule('close', 1, -1, payload={'reason': 'idle'})
+        self.scheduler.schedule('close', 2, 60)
+        await self.run_scheduler()
+
+        self.assertEqual(self.fired, [(1, {'reason': 'idle'})])
+        self.assertIsNone(self.scheduler.get('close', 1))
+        self.assertIsNone(self.store.get('scheduler:close', 1))
+        self.assertEqual(len(self.scheduler), 1)
+
+    async def test_reschedule_replaces_due_time(self):
+        self.scheduler.schedule('close', 1, -1)
+        self.scheduler.schedule('close', 1, 60)
+        await self.run_scheduler()
+
+        self.assertEqual(self.fired, [])
+        self.assertGreater(self.scheduler.get('close', 1), time.time())
+        self.assertGreater(self.store.get('scheduler:close', 1)['due'], time.time())
+
+    async def test_reschedule_wakes_running_scheduler(self):
+        self.scheduler.schedule('close', 1, 60)
+        await self.run_scheduler()
+        self.scheduler.schedule('close', 1, -1)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(self.fired, [(1, {})])
+
+    async def test_cancel(self):
+        self.scheduler.schedule('close', 1, -1)
+        self.scheduler.cancel('close', 1)
+        self.scheduler.cancel('close', 2)
+        await self.run_scheduler()
+
+        self.assertEqual(self.fired, [])
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertIsNone(self.store.get('scheduler:close', 1))
+
+    def test_heap_is_compacted(self):
+        for _ in range(200):
+            self.scheduler.schedule('close', 1, 60)
+
+        self.assertEqual(len(self.scheduler), 1)
+        self.assertLessEqual(len(self.scheduler.heap), 2 * len(self.scheduler) + 64)
+
+    async def test_load_restores_saved_tasks(self):
+        self.scheduler.schedule('close', 1, -1, payload={'reason': 'idle'})
+        self.scheduler.schedule('close', 2, 60)
+        self.scheduler.schedule('other', 3, 60)
+        await self.store.flush()
+
+        self.scheduler = self.create_scheduler()
+        self.scheduler.load()
+        self.assertEqual(len(self.scheduler), 2)
+        self.assertIsNone(self.scheduler.get('other', 3))
+
+        # Действие, зарегистрированное после загрузки, поднимает свои записи сразу
+        self.scheduler.register('other', self.create_scheduler().handlers['close'])
+        self.assertIsNotNone(self.scheduler.get('other', 3))
+
+        await self.run_scheduler()
+        self.assertEqual(self.fired, [(1, {'reason': 'idle'})])
+
+    async def test_overdue_tasks_wait_for_ready(self):
+        ready = asyncio.Event()
+        self.scheduler.schedule('close', 1, -1)
+        await self.run_scheduler(ready.wait)
+        self.assertEqual(self.fired, [])
+
+        ready.set()
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.fired, [(1, {})])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from storage import SQLiteViewStore, WriteBehindStore
+
+
+class FlakySQLiteViewStore(SQLiteViewStore):
+    fail = False
+
+    def apply(self, changes):
+        if self.fail:
+            raise OSError('disk full')
+        super().apply(changes)
+
+
+def view(message_id: int, channel_id: int = 10, **data) -> dict:
+    return {'message_id': message_id, 'channel_id': channel_id, **data}
+
+
+class WriteBehindStoreTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'views.sqlite3'
+        self.backend = FlakySQLiteViewStore(str(self.path))
+        self.store = WriteBehindStore(self.backend, 60)
+        self.addCleanup(self.store.close)
+
+    async def stored(self, *records: dict):
+        self.store.put_many('views', list(records))
+        self.assertTrue(await self.store.flush())
+
+    async def test_overlay_wins_over_backend(self):
+        await self.stored(view(1, label='old'), view(2))
+        self.store.put('views', view(1, label='new'))
+        self.store.delete('views', [2])
+        self.store.put('views', view(3))
+
+        self.assertEqual(self.store.get('views', 1)['label'], 'new')
+        self.assertIsNone(self.store.get('views', 2))
+        self.assertEqual([record['message_id'] for record in self.store.all('views')], [1, 3])
+        self.assertEqual(self.backend.get('views', 1)['label'], 'old')
+
+    async def test_page_skips_deleted_records(self):
+        await self.stored(*(view(message_id) for message_id in range(1, 7)))
+        self.store.delete('views', [1, 2, 3])
+        self.store.put('views', view(5, label='new'))
+
+        page = self.store.page('views', 0, 3)
+        self.assertEqual([record['message_id'] for record in page], [4, 5, 6])
+        self.assertEqual(page[1]['label'], 'new')
+        self.assertEqual(self.store.page('views', 6, 3), [])
+
+    async def test_find_follows_moved_records(self):
+        await self.stored(view(1, channel_id=10), view(2, channel_id=10), view(3, channel_id=20))
+        self.store.put('views', view(1, channel_id=20))
+        self.store.delete('views', [2])
+        self.store.put('views', view(4, channel_id=10))
+
+        self.assertEqual(sorted(record['message_id'] for record in self.store.find('views', channel_id=10)), [4])
+        self.assertEqual(sorted(record['message_id'] for record in self.store.find('views', channel_id=20)), [1, 3])
+
+    async def test_find_by_ticket_channel(self):
+        self.store.put('views', {'message_id': 1, 'channel_id': 30, 'notification_id': 5})
+        self.store.put('views', view(2, ticket_channel_id=30))
+
+        self.assertEqual(sorted(record['message_id'] for record in self.store.find('views', ticket_channel_id=30)), [1, 2])
+        with self.assertRaises(ValueError):
+            self.store.find('views')
+
+    async def test_count(self):
+        await self.stored(view(1), view(2))
+        self.store.put('views', view(2, label='new'))
+        self.store.put('views', view(3))
+        self.store.delete('views', [1, 4])
+
+        self.assertEqual(self.store.count('views'), 2)
+        self.assertEqual(self.store.count('other'), 0)
+
+    async def test_failed_flush_keeps_changes(self):
+        await self.stored(view(1, label='old'))
+        self.store.put('views', view(1, label='lost'))
+        self.store.put('views', view(2))
+        self.backend.fail = True
+
+        self.assertFalse(await self.store.flush())
+        # Изменения, сделанные после неудачного сброса, новее сохраненных для повтора
+        self.store.put('views', view(1, label='new'))
+        self.assertEqual(self.store.get('views', 1)['label'], 'new')
+
+        self.backend.fail = False
+        self.assertTrue(await self.store.flush())
+        self.assertEqual(self.backend.get('views', 1)['label'], 'new')
+        self.assertIsNotNone(self.backend.get('views', 2))
+        self.assertEqual(self.store.pending, {})
+
+    async def test_close_writes_pending_changes(self):
+        self.store.put('views', view(1))
+        self.store.close()
+
+        with self.assertRaises(RuntimeError):
+            self.store.put('views', view(2))
+        reopened = SQLiteViewStore(str(self.path))
+        self.addCleanup(reopened.close)
+        self.assertEqual([record['message_id'] for record in reopened.all('views')], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
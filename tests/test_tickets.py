@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from storage import SQLiteViewStore, WriteBehindStore
+from tickets import Ticket, TicketRegistry
+
+
+class TicketRegistryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = WriteBehindStore(SQLiteViewStore(str(Path(directory.name) / 'views.sqlite3')), 60)
+        self.addCleanup(self.store.close)
+        self.tickets = TicketRegistry(self.store, 'notifications', 'tickets')
+
+    def add_ticket(self, channel_id: int = 100, user_id: int = 7, prefix: str = 'help', guild_id: int = 1) -> Ticket:
+        ticket = Ticket(channel_id, notification_id=channel_id + 1, notification_channel_id=50, message_id=channel_id + 2, user_id=user_id, prefix=prefix, guild_id=guild_id)
+        self.tickets.add(ticket)
+        return ticket
+
+    def test_reserve_blocks_second_ticket_until_released(self):
+        self.assertTrue(self.tickets.reserve(1, 7, 'help'))
+        self.assertFalse(self.tickets.reserve(1, 7, 'help'))
+        self.assertTrue(self.tickets.reserve(1, 7, 'report'))
+        self.assertTrue(self.tickets.reserve(2, 7, 'help'))
+
+        self.tickets.release(1, 7, 'help')
+        self.assertTrue(self.tickets.reserve(1, 7, 'help'))
+
+    def test_reserve_refuses_open_ticket(self):
+        self.tickets.reserve(1, 7, 'help')
+        self.add_ticket()
+
+        self.assertNotIn((1, 7, 'help'), self.tickets.pending)
+        self.assertFalse(self.tickets.reserve(1, 7, 'help'))
+        self.tickets.remove(100)
+        self.assertTrue(self.tickets.reserve(1, 7, 'help'))
+
+    def test_discard_one_message_keeps_ticket(self):
+        ticket = self.add_ticket()
+        self.tickets.discard_messages([ticket.notification_id, 999])
+
+        self.assertIs(self.tickets.get(100), ticket)
+        self.assertIsNone(ticket.notification_id)
+        self.assertIsNone(self.tickets.get_by_notification(101))
+        self.assertIsNone(self.store.get('notifications', 101))
+        self.assertIsNotNone(self.store.get('tickets', 102))
+        self.assertEqual(self.tickets.count(1), 1)
+
+    def test_discard_both_messages_forgets_ticket(self):
+        self.add_ticket()
+        self.add_ticket(channel_id=200, user_id=8)
+        self.tickets.discard_messages([101, 102])
+
+        self.assertIsNone(self.tickets.get(100))
+        self.assertIsNone(self.tickets.get_by_user(1, 7, 'help'))
+        self.assertEqual(self.tickets.count(1), 1)
+        self.assertEqual(self.store.count('notifications'), 1)
+        self.assertEqual(self.store.count('tickets'), 1)
+
+    def test_load_restores_indexes(self):
+        self.add_ticket()
+        self.add_ticket(channel_id=200, user_id=8, guild_id=2)
+
+        tickets = TicketRegistry(self.store, 'notifications', 'tickets')
+        tickets.load()
+        self.assertEqual(tickets.get(100), self.tickets.get(100))
+        self.assertEqual(tickets.get_by_user(2, 8, 'help').channel_id, 200)
+        self.assertEqual(tickets.get_by_notification(101).channel_id, 100)
+        self.assertEqual(len(tickets), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
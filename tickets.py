@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+
+from storage import ViewStore
+
+
+@dataclass
+class Ticket:
+    channel_id: int
+    notification_id: int | None = None
+    notification_channel_id: int | None = None
+    message_id: int | None = None
+    user_id: int | None = None
+    prefix: str | None = None
+    guild_id: int | None = None
+
+
+class TicketRegistry:
+    def __init__(self, store: ViewStore, notifications_kind: str, tickets_kind: str):
+        self.store = store
+        self.notifications_kind = notifications_kind
+        self.tickets_kind = tickets_kind
+        self.by_channel: dict[int, Ticket] = {}
+        self.by_notification: dict[int, Ticket] = {}
+        self.by_message: dict[int, Ticket] = {}
+        self.by_user: dict[tuple[int, int, str], Ticket] = {}
+        self.by_guild: dict[int, dict[int, Ticket]] = {}
+        self.pending: set[tuple[int, int, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self.by_channel)
+
+    def count(self, guild_id: int) -> int:
+        return len(self.by_guild.get(guild_id, ()))
+
+    def load(self, default_guild_id: int | None = None):
+        # Записи, созданные до поддержки нескольких серверов, относятся к основному серверу
+        for record in self.store.all(self.notifications_kind):
+            ticket = self.by_channel.setdefault(record['ticket_channel_id'], Ticket(record['ticket_channel_id']))
+            ticket.notification_id = record['message_id']
+            ticket.notification_channel_id = record['channel_id']
+            ticket.user_id = record.get('user_id')
+            ticket.prefix = record.get('channel_prefix')
+            ticket.guild_id = record.get('guild_id', default_guild_id)
+        for record in self.store.all(self.tickets_kind):
+            ticket = self.by_channel.setdefault(record['channel_id'], Ticket(record['channel_id']))
+            ticket.message_id = record['message_id']
+            if ticket.notification_id is None:
+                ticket.notification_id = record.get('notification_id')
+            if ticket.guild_id is None:
+                ticket.guild_id = record.get('guild_id', default_guild_id)
+        for ticket in self.by_channel.values():
+            self._index(ticket)
+
+    def _index(self, ticket: Ticket):
+        self.by_channel[ticket.channel_id] = ticket
+        if ticket.notification_id is not None:
+            self.by_notification[ticket.notification_id] = ticket
+        if ticket.message_id is not None:
+            self.by_message[ticket.message_id] = ticket
+        if ticket.user_id is not None:
+            self.by_user[(ticket.guild_id, ticket.user_id, ticket.prefix)] = ticket
+        self.by_guild.setdefault(ticket.guild_id, {})[ticket.channel_id] = ticket
+
+    def _unindex(self, ticket: Ticket):
+        self.by_channel.pop(ticket.channel_id, None)
+        self.by_notification.pop(ticket.notification_id, None)
+        self.by_message.pop(ticket.message_id, None)
+        key = (ticket.guild_id, ticket.user_id, ticket.prefix)
+        if self.by_user.get(key) is ticket:
+            del self.by_user[key]
+        guild_tickets = self.by_guild.get(ticket.guild_id)
+        if guild_tickets is not None:
+            guild_tickets.pop(ticket.channel_id, None)
+            if not guild_tickets:
+                del self.by_guild[ticket.guild_id]
+
+    def get(self, channel_id: int) -> Ticket | None:
+        return self.by_channel.get(channel_id)
+
+    def get_by_notification(self, notification_id: int) -> Ticket | None:
+        return self.by_notification.get(notification_id)
+
+    def get_by_user(self, guild_id: int, user_id: int, prefix: str) -> Ticket | None:
+        return self.by_user.get((guild_id, user_id, prefix))
+
+    def reserve(self, guild_id: int, user_id: int, prefix: str) -> bool:
+        key = (guild_id, user_id, prefix)
+        if key in self.pending or key in self.by_user:
+            return False
+        self.pending.add(key)
+        return True
+
+    def release(self, guild_id: int, user_id: int, prefix: str):
+        self.pending.discard((guild_id, user_id, prefix))
+
+    def add(self, ticket: Ticket):
+        self.release(ticket.guild_id, ticket.user_id, ticket.prefix)
+        self._index(ticket)
+        self.store.put(self.notifications_kind, {
+            'message_id': ticket.notification_id,
+            'channel_id': ticket.notification_channel_id,
+            'ticket_channel_id': ticket.channel_id,
+            'user_id': ticket.user_id,
+            'channel_prefix': ticket.prefix,
+            'guild_id': ticket.guild_id,
+            'persistent': True,
+        })
+        self.store.put(self.tickets_kind, {
+            'message_id': ticket.message_id,
+            'channel_id': ticket.channel_id,
+            'notification_id': ticket.notification_id,
+            'guild_id': ticket.guild_id,
+            'persistent': True,
+        })
+
+    def remove(self, channel_id: int) -> Ticket | None:
+        ticket = self.by_channel.get(channel_id)
+        if ticket is None:
+            return None
+        self._unindex(ticket)
+        if ticket.notification_id is not None:
+            self.store.delete(self.notifications_kind, [ticket.notification_id])
+        if ticket.message_id is not None:
+            self.store.delete(self.tickets_kind, [ticket.message_id])
+        return ticket
+
+    def discard_messages(self, message_ids: list[int]):
+        notification_ids = []
+        ticket_message_ids = []
+        for message_id in message_ids:
+            if ticket := self.by_notification.pop(message_id, None):
+                ticket.notification_id = None
+                notification_ids.append(message_id)
+            elif ticket := self.by_message.pop(message_id, None):
+                ticket.message_id = None
+                ticket_message_ids.append(message_id)
+            else:
+                continue
+            if ticket.notification_id is None and ticket.message_id is None:
+                self._unindex(ticket)
+        self.store.delete(self.notifications_kind, notification_ids)
+        self.store.delete(self.tickets_kind, ticket_message_ids)
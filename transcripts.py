@@ -0,0 +1,117 @@
+import asyncio
+import gzip
+import json
+import logging
+import time
+
+from bisect import bisect_left
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import discord
+
+from analytics import opened_at
+from storage import ViewStore
+from tickets import Ticket
+
+_logger = logging.getLogger(__name__)
+
+# История приходит страницами по 100 сообщений, на диск пишем такими же порциями
+PAGE_SIZE = 100
+
+
+def message_line(message: discord.Message) -> str:
+    return json.dumps({
+        'id': message.id,
+        'author_id': message.author.id,
+        'author': str(message.author),
+        'created_at': message.created_at.isoformat(),
+        'edited_at': message.edited_at.isoformat() if message.edited_at else None,
+        'content': message.content,
+        'embeds': [embed.to_dict() for embed in message.embeds],
+        'attachments': [attachment.url for attachment in message.attachments],
+    }, ensure_ascii=False) + '\n'
+
+
+class TranscriptArchive:
+    def __init__(self, store: ViewStore, kind: str, directory: str):
+        self.store = store
+        self.kind = kind
+        self.directory = Path(directory)
+        self.by_ticket: dict[int, dict] = {}
+        self.by_user: dict[tuple[int, int], list[dict]] = {}
+        self.by_guild: dict[int, list[dict]] = {}
+
+    def load(self):
+        for record in sorted(self.store.all(self.kind), key=lambda record: record['closed_at']):
+            self._index(record)
+
+    def _index(self, record: dict):
+        # Списки упорядочены по времени закрытия, поиск по дате - бинарный
+        self.by_ticket[record['message_id']] = record
+        self.by_guild.setdefault(record['guild_id'], []).append(record)
+        if record['user_id'] is not None:
+            self.by_user.setdefault((record['guild_id'], record['user_id']), []).append(record)
+
+    def get(self, ticket_id: int) -> dict | None:
+        return self.by_ticket.get(ticket_id)
+
+    def path(self, record: dict) -> Path:
+        return self.directory / record['path']
+
+    def find(self, guild_id: int, user_id: int = None, day: date = None, limit: int = 10) -> list[dict]:
+        records = self.by_user.get((guild_id, user_id), []) if user_id else self.by_guild.get(guild_id, [])
+        if day:
+            start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+            first = bisect_left(records, start, key=lambda record: record['closed_at'])
+            last = bisect_left(records, start + 60*60*24, key=lambda record: record['closed_at'])
+            records = records[first:last]
+        return records[-limit:][::-1]
+
+    async def archive(self, channel: discord.TextChannel, ticket: Ticket | None, closed_by: int | None) -> dict:
+        closed_at = time.time()
+        relative = Path(str(channel.guild.id), datetime.fromtimestamp(closed_at, timezone.utc).strftime('%Y-%m'), f'{channel.id}.jsonl.gz')
+        path = self.directory / relative
+        temporary = path.with_name(f'{path.name}.tmp')
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+
+        # В памяти держим не больше одной страницы истории, сжатие и запись идут в отдельном потоке
+        file = await asyncio.to_thread(gzip.open, temporary, 'wt', encoding='utf-8')
+        count = 0
+        try:
+            lines = []
+            async for message in channel.history(limit=None, oldest_first=True):
+                lines.append(message_line(message))
+                if len(lines) >= PAGE_SIZE:
+                    await asyncio.to_thread(file.writelines, lines)
+                    count += len(lines)
+                    lines = []
+            await asyncio.to_thread(file.writelines, lines)
+            count += len(lines)
+        except BaseException:
+            await asyncio.to_thread(file.close)
+            await asyncio.to_thread(temporary.unlink, missing_ok=True)
+            raise
+        await asyncio.to_thread(file.close)
+        await asyncio.to_thread(temporary.replace, path)
+
+        record = {
+            'message_id': channel.id,
+            'guild_id': channel.guild.id,
+            'user_id': ticket.user_id if ticket else None,
+            'prefix': ticket.prefix if ticket else None,
+            'name': channel.name,
+            # Канал мог быть взят из пула, поэтому время открытия - по сообщению тикета, а не по созданию канала
+            'opened_at': opened_at(ticket) if ticket else channel.created_at.timestamp(),
+            'closed_at': closed_at,
+            'closed_by': closed_by,
+            'messages': count,
+            'path': relative.as_posix(),
+        }
+        self.store.put(self.kind, record)
+        self._index(record)
+        _logger.info(
+            f'Переписка тикета {channel.name} сохранена в {path} ({count} сообщений)',
+            extra={'event': 'transcript_saved', 'guild': channel.guild.id, 'channel': channel.id, 'latency': time.time() - closed_at},
+        )
+        return record
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from collections import Counter
+from pathlib import Path
+
+_logger = logging.getLogger(__name__)
+
+PROJECT_DIR = str(Path(__file__).resolve().parent)
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float, top: int):
+        self.threshold = threshold
+        self.top = top
+        # Поток проверяет цикл чаще порога, чтобы поймать стек во время зависания
+        self.interval = threshold / 4
+        self.beat = time.monotonic()
+        self.loop_thread_id: int | None = None
+        self.offenders: Counter[str] = Counter()
+        self.stalls = 0
+        self.task: asyncio.Task | None = None
+        self.thread: threading.Thread | None = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.task = asyncio.create_task(self.heartbeat())
+        self.thread = threading.Thread(target=self.watch, name='loop-watchdog', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.task:
+            self.task.cancel()
+
+    async def heartbeat(self):
+        while True:
+            self.beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def watch(self):
+        longest = 0.0
+        samples: Counter[str] = Counter()
+        while not self.stopped.wait(self.interval):
+            beat = self.beat
+            stalled = time.monotonic() - beat
+            if stalled < self.threshold:
+                if samples:
+                    self.report(longest, samples)
+                    longest = 0.0
+                    samples = Counter()
+                continue
+
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            if not samples:
+                _logger.warning(
+                    f'Цикл событий заблокирован дольше {self.threshold:.2f} сек., стек:\n'
+                    + ''.join(traceback.format_list(stack[-10:]))
+                )
+            samples[self.offender(stack)] += 1
+            longest = stalled
+
+    def offender(self, stack: traceback.StackSummary) -> str:
+        # Виновником считаем ближайший к вершине стека кадр из кода проекта
+        for frame in reversed(stack):
+            if frame.filename.startswith(PROJECT_DIR):
+                return f'{Path(frame.filename).name}:{frame.lineno} {frame.name}'
+        frame = stack[-1]
+        return f'{frame.filename}:{frame.lineno} {frame.name}'
+
+    def report(self, duration: float, samples: Counter[str]):
+        self.stalls += 1
+        for offender, count in samples.items():
+            self.offenders[offender] += count * self.interval
+        offender, count = samples.most_common(1)[0]
+        _logger.warning(f'Цикл событий был заблокирован {duration:.2f} сек., чаще всего в {offender}')
+        worst = ', '.join(f'{offender} ({seconds:.2f} сек.)' for offender, seconds in self.offenders.most_common(self.top))
+        _logger.info(f'Худшие места блокировок за {self.stalls} зависаний: {worst}')